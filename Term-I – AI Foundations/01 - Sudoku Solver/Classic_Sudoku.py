@@ -1,3 +1,5 @@
+from sudoku import topology
+
 #Row-Column Labels
 rows = 'ABCDEFGHI'
 cols = '123456789'
@@ -8,17 +10,9 @@ def cross(a, b):
     """
     return [s+t for s in a for t in b]
 
-#Defining Boxes
-boxes = cross(rows, cols)
-
-#Defining Units
-row_units = [cross(r, cols) for r in rows]
-column_units = [cross(rows, c) for c in cols]
-square_units = [cross(rs, cs) for rs in ('ABC','DEF','GHI') for cs in ('123','456','789')]
-unitlist = row_units + column_units + square_units
-
-units = dict((s, [u for u in unitlist if s in u]) for s in boxes)
-peers = dict((s, set(sum(units[s],[]))-set([s])) for s in boxes)
+#Boxes, Units and Peers come from the topology tables shared with sudoku.py
+boxes, unitlist, unit_index, peers = topology(rows, cols)
+units = dict((s, [unitlist[u] for u in unit_index[s]]) for s in boxes)
 
 #Testing Example
 #grid = '..3.2.6..9..3.5..1..18.64....81.29..7.......8..67.82....26.95..8..2.3..9..5.1.3..'
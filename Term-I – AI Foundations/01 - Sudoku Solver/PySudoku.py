@@ -1,10 +1,24 @@
 import sys, os, random, pygame
-sys.path.append(os.path.join("objects"))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "objects"))
 import SudokuSquare
 from GameResources import *
 
 digits = '123456789'
 rows = 'ABCDEFGHI'
+BOARD_IMAGE = os.path.join(HERE, "images", "sudoku-board-bare.jpg")
+
+def square_origin(x, y):
+    """Top-left pixel of the square in column x, row y of the board image."""
+    startX = (x * 57) + (38, 99, 159)[x // 3]
+    startY = (y * 57) + (35, 100, 165)[y // 3]
+    return startX, startY
+
+def square_number(string_number):
+    """The digit shown for a box value, None while it is unsolved."""
+    if len(string_number) > 1 or string_number == '' or string_number == '.':
+        return None
+    return int(string_number)
 
 
 def play(values_list):
@@ -14,7 +28,7 @@ def play(values_list):
     size = width, height = 700, 700
     screen = pygame.display.set_mode(size)
 
-    background_image = pygame.image.load("./images/sudoku-board-bare.jpg").convert()
+    background_image = pygame.image.load(BOARD_IMAGE).convert()
 
     clock = pygame.time.Clock()
 
@@ -30,20 +44,10 @@ def play(values_list):
         startX, startY, editable, number = 0, 0, "N", 0
         for y in range(9):
             for x in range(9):
-                if x in (0, 1, 2):  startX = (x * 57) + 38
-                if x in (3, 4, 5):  startX = (x * 57) + 99
-                if x in (6, 7, 8):  startX = (x * 57) + 159
-
-                if y in (0, 1, 2):  startY = (y * 57) + 35
-                if y in (3, 4, 5):  startY = (y * 57) + 100
-                if y in (6, 7, 8):  startY = (y * 57) + 165
+                startX, startY = square_origin(x, y)
                 col = digits[x]
                 row = rows[y]
-                string_number = values[row + col]
-                if len(string_number) > 1 or string_number == '' or string_number == '.':
-                    number = None
-                else:
-                    number = int(string_number)
+                number = square_number(values[row + col])
                 theSquares.append(SudokuSquare.SudokuSquare(number, startX, startY, editable, x, y))
 
         screen.blit(background_image, (0, 0))
@@ -61,6 +65,68 @@ def play(values_list):
                 pygame.quit()
                 quit()
 
+class ReplayRenderer():
+    """Off-screen board that redraws only the boxes that change.
+
+    Needs no display: the board is drawn on a plain Surface, and drawing
+    a box first restores its patch of the background image.
+    """
+
+    def __init__(self, values):
+        self.background = pygame.image.load(BOARD_IMAGE)
+        self.surface = self.background.copy()
+        for box, value in values.items():
+            self.draw_box(box, value)
+
+    def draw_box(self, box, value):
+        x, y = digits.index(box[1]), rows.index(box[0])
+        startX, startY = square_origin(x, y)
+        area = pygame.Rect(startX, startY, 45, 40)
+        self.surface.blit(self.background, area, area)
+        SudokuSquare.SudokuSquare(square_number(value), startX, startY, "N", x, y).draw(self.surface)
+
+def render_replay(recorder, path, fps=5):
+    """Render the deltas of a sudoku.AssignmentRecorder without a display.
+
+    One frame is written for the initial values and one per delta. `path`
+    ending in '.gif' writes an animated GIF (needs Pillow), with every
+    frame mapped to the palette of the first so only changed pixels are
+    stored. Otherwise it is a pattern such as 'replay/{:04d}.png' formatted
+    with the frame number, in any image format pygame can save.
+
+    Returns:
+        The number of frames rendered.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    gif = path.lower().endswith(".gif")
+    if gif:
+        from PIL import Image
+        images = []
+
+    renderer = ReplayRenderer(recorder.initial)
+    size = renderer.surface.get_size()
+    count = 0
+    for delta in [None] + list(recorder.deltas):
+        if delta is not None:
+            box, old, new = delta
+            renderer.draw_box(box, new)
+        if gif:
+            image = Image.frombytes("RGB", size, pygame.image.tostring(renderer.surface, "RGB"))
+            if images:
+                image = image.quantize(palette=images[0], dither=Image.NONE)
+            else:
+                image = image.quantize()
+            images.append(image)
+        else:
+            pygame.image.save(renderer.surface, path.format(count))
+        count += 1
+
+    if gif:
+        images[0].save(path, save_all=True, append_images=images[1:],
+                       duration=int(1000 / fps), loop=0, optimize=False)
+    return count
+
 if __name__ == "__main__":
     main()
     sys.exit()
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""Solve many Sudoku grids at once with NumPy.
+
+N puzzles are held as an (N, boxes, digits) boolean candidate tensor, and
+eliminate/only_choice run as matrix products over every puzzle together:
+the peer matrix counts, per box and digit, the solved peers holding that
+digit, and the unit matrix counts the places of each digit in each unit.
+Puzzles that propagation leaves unsolved fall back to `Sudoku.search`.
+
+    python batch.py puzzles.txt --classic > solutions.txt
+"""
+import argparse
+import sys
+from itertools import islice
+
+import numpy as np
+
+import sudoku as sdk
+from solution import read_grids
+
+_MATRICES = {}
+
+def matrices(size=9, diag=False):
+    """Return the (unit x box) membership and (box x box) peer matrices of a
+    grid shape as float32 arrays, building them on first use.
+    """
+    key = (size, diag)
+    if key not in _MATRICES:
+        rows, cols, _ = sdk.labels(size)
+        boxes, unitlist, _, peers = sdk.topology(rows, cols, diag)
+        index = {box: i for i, box in enumerate(boxes)}
+        members = np.zeros((len(unitlist), len(boxes)), np.float32)
+        for u, unit in enumerate(unitlist):
+            members[u, [index[box] for box in unit]] = 1
+        peer = np.zeros((len(boxes), len(boxes)), np.float32)
+        for box in boxes:
+            peer[index[box], [index[p] for p in peers[box]]] = 1
+        _MATRICES[key] = members, peer
+    return _MATRICES[key]
+
+def encode(grids, size=9):
+    """Return the (N, size*size, size) candidate tensor of grid strings."""
+    digits = sdk.SYMBOLS[:size]
+    candidates = np.ones((len(grids), size * size, size), bool)
+    for n, grid in enumerate(grids):
+        if len(grid) != size * size:
+            raise ValueError('expected a grid of {} boxes, got {}'.format(size * size, len(grid)))
+        for b, char in enumerate(grid):
+            if char in '.0':
+                continue
+            d = digits.find(char)
+            if d < 0:
+                raise ValueError('invalid symbol {!r} in grid'.format(char))
+            candidates[n, b] = False
+            candidates[n, b, d] = True
+    return candidates
+
+def decode(candidates, boxes):
+    """Return a values dictionary for one puzzle's (boxes, digits) candidates."""
+    digits = sdk.SYMBOLS[:candidates.shape[1]]
+    return {box: ''.join(digit for digit, on in zip(digits, row) if on)
+            for box, row in zip(boxes, candidates.tolist())}
+
+def _products(matrix, candidates):
+    """Multiply `matrix` into the box axis of every puzzle with one product."""
+    n, nboxes, ndigits = candidates.shape
+    flat = candidates.transpose(1, 0, 2).reshape(nboxes, n * ndigits).astype(np.float32)
+    return np.dot(matrix, flat).reshape(-1, n, ndigits).transpose(1, 0, 2)
+
+def propagate(candidates, diag=False):
+    """Run eliminate and only_choice on every puzzle to a fixpoint.
+
+    Args:
+        candidates: (N, boxes, digits) boolean tensor, updated in place
+        diag(bool): use diagonal units
+    Returns:
+        A boolean array marking the puzzles that hit a contradiction: a box
+        without candidates, a digit with no place in a unit, or a box that
+        is the only place for two digits.
+    """
+    size = candidates.shape[2]
+    members, peer = matrices(size, diag)
+    dead = np.zeros(len(candidates), bool)
+    active = np.arange(len(candidates))
+    while len(active):
+        cand = candidates[active]
+        before = cand.sum(axis=(1, 2))
+
+        # Eliminate: drop digits held by a solved peer
+        solved = cand & (cand.sum(axis=2) == 1)[:, :, None]
+        cand &= _products(peer, solved) == 0
+
+        # Only choice: a digit with one place in a unit goes there
+        places = _products(members, cand)
+        single = (_products(members.T, places == 1) > 0) & cand
+        hidden = single.any(axis=2)
+        cand[hidden] = single[hidden]
+
+        failed = ((cand.sum(axis=2) == 0).any(axis=1) | (places == 0).any(axis=(1, 2)) |
+                  (single.sum(axis=2) > 1).any(axis=1))
+        candidates[active] = cand
+        dead[active[failed]] = True
+        moving = (cand.sum(axis=(1, 2)) < before) & ~failed
+        active = active[moving]
+    return dead
+
+def solve_batch(grids, diag=True, size=9):
+    """Solve a list of grid strings together.
+
+    Returns:
+        A list with the solved grid string of each puzzle, or None for
+        puzzles without a solution.
+    """
+    grids = list(grids)
+    candidates = encode(grids, size)
+    dead = propagate(candidates, diag)
+    rows, cols, digits = sdk.labels(size)
+    boxes = sdk.topology(rows, cols, diag).boxes
+
+    # Grids solved by propagation are read off as one byte per box
+    solved = (candidates.sum(axis=2) == 1).all(axis=1)
+    symbols = np.frombuffer(digits.encode(), np.uint8)[candidates.argmax(axis=2)]
+
+    solutions = []
+    for n in range(len(grids)):
+        if dead[n]:
+            solutions.append(None)
+        elif solved[n]:
+            solutions.append(symbols[n].tobytes().decode())
+        else:
+            sudoku = sdk.Sudoku(decode(candidates[n], boxes), partial=True, diag=diag)
+            solutions.append(''.join(sudoku.values[box] for box in boxes)
+                             if sudoku.search() else None)
+    return solutions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve Sudoku puzzles in batches with NumPy.')
+    parser.add_argument('puzzles', help="file with one puzzle per line, '-' for stdin")
+    parser.add_argument('--classic', action='store_true',
+                        help='solve classic instead of diagonal Sudokus')
+    parser.add_argument('--size', type=int, choices=sdk.SIZES, default=9)
+    parser.add_argument('--batch', type=int, default=10000,
+                        help='puzzles propagated together (default: 10000)')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.puzzles == '-' else open(args.puzzles)
+    failures = 0
+    with source:
+        # Read one batch at a time, so memory doesn't grow with the file
+        grids = read_grids(source)
+        while True:
+            chunk = list(islice(grids, args.batch))
+            if not chunk:
+                break
+            for grid, solved in zip(chunk, solve_batch(chunk, not args.classic, args.size)):
+                failures += solved is None
+                print('{}\t{}'.format(grid, 'UNSOLVABLE' if solved is None else solved))
+            sys.stdout.flush()
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Time the Sudoku solver across grid sizes.
+
+Puzzles are made by relabeling a patterned solved grid and blanking a
+fraction of its boxes, so every size gets comparable, solvable inputs.
+
+    python benchmark.py --sizes 4 9 16 25 --trials 5 --holes 0.5
+"""
+import argparse
+import random
+import time
+
+import sudoku as sdk
+
+def patterned_grid(size, holes, rng):
+    """Return a solvable size*size-char grid with `holes` of its boxes blank."""
+    block = int(round(size ** 0.5))
+    digits = list(sdk.SYMBOLS[:size])
+    rng.shuffle(digits)
+    grid = [digits[(block * (r % block) + r // block + c) % size]
+            for r in range(size) for c in range(size)]
+    for i in rng.sample(range(size * size), int(holes * size * size)):
+        grid[i] = '.'
+    return ''.join(grid)
+
+def benchmark(size, trials, holes, seed=0):
+    """Return the mean (construct, reduce, search) seconds for one size."""
+    rng = random.Random(seed)
+    totals = [0., 0., 0.]
+    for _ in range(trials):
+        grid = patterned_grid(size, holes, rng)
+
+        start = time.perf_counter()
+        puzzle = sdk.Sudoku(grid)
+        built = time.perf_counter()
+        puzzle.reduce_puzzle()
+        reduced = time.perf_counter()
+        assert sdk.Sudoku(grid).search()
+        searched = time.perf_counter()
+
+        totals[0] += built - start
+        totals[1] += reduced - built
+        totals[2] += searched - reduced
+    return [t / trials for t in totals]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Sudoku solver across sizes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(sdk.SIZES))
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--holes', type=float, default=0.5,
+                        help='fraction of boxes left blank')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print('{:>5} {:>12} {:>12} {:>12}'.format('size', 'init ms', 'reduce ms', 'search ms'))
+    for size in args.sizes:
+        init, reduce, search = benchmark(size, args.trials, args.holes, args.seed)
+        print('{:>5} {:>12.3f} {:>12.3f} {:>12.3f}'.format(
+            size, 1000 * init, 1000 * reduce, 1000 * search))
+
+if __name__ == '__main__':
+    main()
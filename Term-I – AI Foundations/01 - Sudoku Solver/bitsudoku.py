@@ -0,0 +1,202 @@
+"""Bitmask-backed Sudoku engine.
+
+`BitSudoku` exposes the same interface as `sudoku.Sudoku` (constructor,
+`search()`, `reduce_puzzle()`, `naked_twins()`, `display()` and `values`),
+but keeps the candidates of every box as a 9-bit integer mask in a flat
+81-slot list. Peers and units are precomputed as index tables, so removing
+a digit from a peer is a single `&=` instead of a `str.replace`.
+"""
+
+from sudoku import topology
+
+# Index tables are shared by every instance with the same shape.
+_TABLES = {}
+
+
+def _build_tables(rows, cols, diag):
+    """Build the index tables for a grid shape from its shared topology.
+
+    Returns:
+        (boxes, unitlist, units, peers, masks, digits, counts) where units
+        and peers are tuples of box indices, `masks` maps a digit to its bit,
+        and `digits`/`counts` map every mask to its digit string/bit count.
+    """
+    topo = topology(rows, cols, diag)
+    boxes = topo.boxes
+    index = {box: i for i, box in enumerate(boxes)}
+
+    unitlist = tuple(tuple(index[box] for box in unit) for unit in topo.unitlist)
+    units = tuple(topo.units[box] for box in boxes)
+    peers = tuple(tuple(sorted(index[p] for p in topo.peers[box])) for box in boxes)
+
+    masks = {digit: 1 << i for i, digit in enumerate(cols)}
+    digits = [''.join(d for d in cols if m & masks[d]) for m in range(1 << len(cols))]
+    counts = [bin(m).count('1') for m in range(1 << len(cols))]
+    return boxes, unitlist, units, peers, masks, digits, counts
+
+
+def _tables(rows, cols, diag):
+    key = (rows, cols, diag)
+    if key not in _TABLES:
+        _TABLES[key] = _build_tables(rows, cols, diag)
+    return _TABLES[key]
+
+
+class BitSudoku():
+    """Initializing and solving a classic/diagonal Sudoku on bitmasks.
+
+    ATTRIBUTES:
+        grid        : row-wise string representation of Sudoku
+        rows        : string 'ABCDEFGHI'
+        cols        : string '123456789'
+        boxes       : list of all squares
+        unitlist    : tuple of units, each a tuple of box indices
+        peers       : tuple of peer indices for each box index
+        cells       : list of candidate masks, one per box
+        values      : dictionary of box:digits (built from `cells`)
+    """
+
+    def __init__(self, grid, partial=False, diag=False, rows='ABCDEFGHI', cols='123456789'):
+        """
+            Args:
+            - grid      : 81-char string to be solved if 'partial = False'
+                          else intermediate solution as a dict of box:values
+            - partial   : init with string or partial solution
+            - diag      : boolean - diagonal Sudoku = True
+        """
+        self.grid = grid
+        self.rows = rows
+        self.cols = cols
+        (self.boxes, self.unitlist, self.units, self.peers,
+         self.masks, self.digits, self.counts) = _tables(rows, cols, diag)
+        self.full = (1 << len(cols)) - 1
+        if len(grid) != len(self.boxes):
+            # Only the 9x9 shape is supported; see sudoku.Sudoku for N x N
+            raise ValueError('expected a grid of {} boxes, got {}'.format(len(self.boxes), len(grid)))
+
+        if partial:
+            self.values = grid
+        else:
+            self.cells = [self.full if char == '.' else self.masks[char]
+                          for char in grid]
+
+    @property
+    def values(self):
+        """Dictionary of box:digits, in the same form as `Sudoku.values`."""
+        return {box: self.digits[m] for box, m in zip(self.boxes, self.cells)}
+
+    @values.setter
+    def values(self, values):
+        masks = self.masks
+        cells = []
+        for box in self.boxes:
+            m = 0
+            for digit in values[box]:
+                m |= masks[digit]
+            cells.append(m)
+        self.cells = cells
+
+    def display(self):
+        """Display the values as a 2-D grid."""
+        values = self.values
+        width = 1+max(len(values[s]) for s in self.boxes)
+        line = '+'.join(['-'*(width*3)]*3)
+        for r in self.rows:
+            print(''.join(values[r+c].center(width)+('|' if c in '36' else '')
+                      for c in self.cols))
+            if r in 'CF': print(line)
+        print('\n')
+
+    def solved_values(self):
+        counts = self.counts
+        return [box for box, m in zip(self.boxes, self.cells) if counts[m] == 1]
+
+    def eliminate(self):
+        """Remove the digit of every solved box from all of its peers."""
+        cells, counts, peers = self.cells, self.counts, self.peers
+        for i in range(len(cells)):
+            m = cells[i]
+            if counts[m] == 1:
+                keep = ~m
+                for p in peers[i]:
+                    cells[p] &= keep
+
+    def only_choice(self):
+        """Assign every digit that fits in only one box of a unit.
+
+        Digits seen exactly once in a unit are found with two running masks
+        (`once`, `twice`) instead of scanning the unit once per digit.
+        """
+        cells = self.cells
+        for unit in self.unitlist:
+            once = twice = 0
+            for i in unit:
+                m = cells[i]
+                twice |= once & m
+                once |= m
+            singles = once & ~twice
+            if singles:
+                for i in unit:
+                    m = cells[i] & singles
+                    if m:
+                        cells[i] = m
+
+    def naked_twins(self):
+        """Eliminate values using the naked twins strategy."""
+        cells, counts = self.cells, self.counts
+        for unit in self.unitlist:
+            seen = set()
+            twins = set()
+            for i in unit:
+                m = cells[i]
+                if counts[m] == 2:
+                    if m in seen:
+                        twins.add(m)
+                    seen.add(m)
+            for twin in twins:
+                keep = ~twin
+                for i in unit:
+                    m = cells[i]
+                    if m != twin and counts[m] > 1:
+                        cells[i] = m & keep
+
+    def reduce_puzzle(self):
+        """Iterate eliminate() and only_choice() until nothing changes.
+
+        Returns:
+            True if a box ran out of candidates (failed), False otherwise.
+        """
+        while True:
+            before = list(self.cells)
+            self.eliminate()
+            self.only_choice()
+            if 0 in self.cells:
+                return True
+            if self.cells == before:
+                return False
+
+    def search(self):
+        """Using depth-first search and propagation, solve the sudoku.
+
+        Returns:
+            True if solved, False if the puzzle has no solution.
+        """
+        if self.reduce_puzzle():
+            return False
+        counts = self.counts
+        unsolved = [(counts[m], i) for i, m in enumerate(self.cells) if counts[m] > 1]
+        if not unsolved:
+            return True
+
+        # Choose box with min possibilities
+        _, i = min(unsolved)
+        candidates = self.cells[i]
+        while candidates:
+            bit = candidates & -candidates
+            candidates ^= bit
+            tmp = list(self.cells)
+            self.cells[i] = bit
+            if self.search():
+                return True
+            self.cells = tmp
+        return False
@@ -0,0 +1,260 @@
+"""Canonical forms of Sudoku grids under the Sudoku symmetry group.
+
+Two puzzles are equivalent if one turns into the other by relabeling
+digits, permuting rows within a band, permuting bands, doing the same for
+columns and stacks, and transposing. The canonical form is the smallest
+row-major string, with blanks before digits, over every such transform;
+digits are relabeled 1, 2, ... in order of first appearance, so only the
+box permutation has to be searched. Diagonal puzzles only allow the
+transforms that keep both diagonals as diagonals.
+
+Equivalent puzzles have equal canonical forms, so a stream of puzzles can
+be deduplicated, and one solution serves every puzzle equivalent to it:
+
+    cache = SolutionCache(diag=False)
+    solution = cache.solve(grid)
+"""
+from collections import OrderedDict, namedtuple
+from itertools import permutations, product
+
+import sudoku as sdk
+
+class Transform(namedtuple('Transform', ['transpose', 'rows', 'cols', 'digits'])):
+    """A symmetry of the Sudoku grid.
+
+    Box (i, j) of the result is box (rows[i], cols[j]) of the grid, after
+    transposing it if `transpose`; `digits` maps each symbol of the grid to
+    its symbol in the result.
+    """
+
+    def apply(self, grid):
+        """Return the transformed grid string."""
+        size = len(self.rows)
+        if self.transpose:
+            grid = _transposed(grid, size)
+        return ''.join(self.digits.get(grid[r * size + c], '.')
+                       for r in self.rows for c in self.cols)
+
+    def restore(self, grid):
+        """Undo apply(), e.g. to map the solution of a canonical grid back
+        onto the original puzzle.
+        """
+        size = len(self.rows)
+        inverse = {new: old for old, new in self.digits.items()}
+        out = ['.'] * (size * size)
+        for i, r in enumerate(self.rows):
+            for j, c in enumerate(self.cols):
+                out[r * size + c] = inverse.get(grid[i * size + j], '.')
+        out = ''.join(out)
+        return _transposed(out, size) if self.transpose else out
+
+def _transposed(grid, size):
+    return ''.join(grid[c * size + r] for r in range(size) for c in range(size))
+
+def _block(size):
+    block = int(round(size ** 0.5))
+    if size not in sdk.SIZES or block > 3:
+        raise ValueError('canonical forms are only supported for 4x4 and 9x9 grids')
+    return block
+
+_PERMUTATIONS = {}
+
+def band_permutations(size):
+    """Return every permutation of 0..size-1 that keeps bands together,
+    i.e. permutes the bands and the lines within each band.
+    """
+    if size not in _PERMUTATIONS:
+        block = _block(size)
+        _PERMUTATIONS[size] = [tuple(b * block + i for b, lines in zip(bands, inner) for i in lines)
+                               for bands in permutations(range(block))
+                               for inner in product(permutations(range(block)), repeat=block)]
+    return _PERMUTATIONS[size]
+
+def diagonal_permutations(size):
+    """Return the band permutations that commute with reversing the lines,
+    which are the ones that keep both diagonals when applied to rows and
+    columns alike.
+    """
+    last = size - 1
+    return [p for p in band_permutations(size)
+            if all(p[last - i] == last - p[i] for i in range(size))]
+
+def _matrix(grid, size):
+    digits = sdk.SYMBOLS[:size]
+    rows = []
+    for r in range(size):
+        row = []
+        for char in grid[r * size:(r + 1) * size]:
+            if char in '.0':
+                row.append(0)
+            elif char in digits:
+                row.append(digits.index(char) + 1)
+            else:
+                raise ValueError('invalid symbol {!r} in grid'.format(char))
+        rows.append(row)
+    return rows
+
+def _relabel(row, labels, best):
+    """Relabel `row` (digits 1..n, 0 for blank) extending `labels` by first
+    appearance. Returns (relabeled row, labels), or None as soon as the row
+    is known to compare greater than `best`.
+    """
+    labels = list(labels)
+    out = []
+    tied = best is not None
+    for k, value in enumerate(row):
+        if value:
+            if not labels[value]:
+                labels[value] = labels[0]
+                labels[0] += 1
+            value = labels[value]
+        if tied:
+            if value > best[k]:
+                return None
+            tied = value == best[k]
+        out.append(value)
+    return out, labels
+
+def _finish(size, transpose, rows, cols, labels):
+    """Build the Transform, giving digits absent from the grid the labels
+    left over, in order.
+    """
+    digits = sdk.SYMBOLS[:size]
+    free = [label for label in range(1, size + 1) if label not in labels[1:]]
+    mapping = {}
+    for d, symbol in enumerate(digits):
+        label = labels[d + 1] or free.pop(0)
+        mapping[symbol] = digits[label - 1]
+    return Transform(transpose, tuple(rows), tuple(cols), mapping)
+
+def _classic(grid, size):
+    """Minimal form over transposition, band permutations of columns and of
+    rows. Column arrangements are fixed up front, and rows are chosen one at
+    a time, keeping only the choices that tie for the smallest row so far.
+    """
+    block = _block(size)
+    perms = band_permutations(size)
+    frontier = []
+    for transpose in (False, True):
+        matrix = _matrix(_transposed(grid, size) if transpose else grid, size)
+        seen = set()
+        for cols in perms:
+            permuted = tuple(tuple(row[c] for c in cols) for row in matrix)
+            # Identical arrangements (e.g. of blank columns) behave the same
+            if permuted in seen:
+                continue
+            seen.add(permuted)
+            frontier.append((transpose, cols, permuted, (), [1] + [0] * size))
+
+    result = []
+    for k in range(size):
+        best, survivors = None, []
+        for transpose, cols, permuted, rows, labels in frontier:
+            if k % block:
+                band = rows[-1] // block
+                choices = [r for r in range(band * block, (band + 1) * block) if r not in rows]
+            else:
+                used = {r // block for r in rows}
+                choices = [r for r in range(size) if r // block not in used]
+            for r in choices:
+                relabeled = _relabel(permuted[r], labels, best)
+                if relabeled is None:
+                    continue
+                row, new_labels = relabeled
+                if best is None or row < best:
+                    best, survivors = row, []
+                survivors.append((transpose, cols, permuted, rows + (r,), new_labels))
+        result.append(best)
+        frontier = survivors
+
+    transpose, cols, _, rows, labels = frontier[0]
+    return result, _finish(size, transpose, rows, cols, labels)
+
+def _diagonal(grid, size):
+    """Minimal form over the transforms keeping both diagonals: the same
+    diagonal permutation on rows and columns, or reversed on the columns
+    (which swaps the diagonals), with or without transposing.
+    """
+    last = size - 1
+    best = None
+    for transpose in (False, True):
+        matrix = _matrix(_transposed(grid, size) if transpose else grid, size)
+        for rows in diagonal_permutations(size):
+            for cols in (rows, tuple(last - c for c in rows)):
+                labels, out = [1] + [0] * size, []
+                for r in rows:
+                    relabeled = _relabel([matrix[r][c] for c in cols], labels,
+                                         best[0][len(out)] if best and out == best[0][:len(out)] else None)
+                    if relabeled is None:
+                        break
+                    row, labels = relabeled
+                    out.append(row)
+                else:
+                    if best is None or out < best[0]:
+                        best = out, (transpose, rows, cols, labels)
+    out, (transpose, rows, cols, labels) = best
+    return out, _finish(size, transpose, rows, cols, labels)
+
+def canonical(grid, diag=False):
+    """Return the canonical form of a 4x4 or 9x9 grid string.
+
+    Args:
+        grid(string): puzzle or solution, '.' or '0' for blanks
+        diag(bool): only use transforms that keep the diagonals
+    Returns:
+        (canonical grid string, Transform) with
+        Transform.apply(grid) == canonical grid.
+    """
+    size = int(round(len(grid) ** 0.5))
+    if size * size != len(grid):
+        raise ValueError('expected a square grid, got {} boxes'.format(len(grid)))
+    rows, transform = (_diagonal if diag else _classic)(grid, size)
+    symbols = '.' + sdk.SYMBOLS[:size]
+    return ''.join(symbols[value] for row in rows for value in row), transform
+
+def dedupe(grids, diag=False):
+    """Yield the grids whose canonical form hasn't been seen before."""
+    seen = set()
+    for grid in grids:
+        form, _ = canonical(grid, diag)
+        if form not in seen:
+            seen.add(form)
+            yield grid
+
+class SolutionCache():
+    """Solve puzzles through their canonical form, so equivalent puzzles are
+    only solved once.
+
+    ATTRIBUTES:
+        diag        : solve diagonal Sudokus
+        maxsize     : canonical solutions kept; least recently used go first
+        entries     : OrderedDict of canonical grid: canonical solution
+                      (None for puzzles without a solution)
+        hits        : puzzles answered from the cache
+        misses      : puzzles that had to be solved
+    """
+
+    def __init__(self, diag=False, maxsize=100000):
+        self.diag = diag
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def solve(self, grid):
+        """Return the solved grid string of a puzzle, or None if it has no
+        solution.
+        """
+        form, transform = canonical(grid, self.diag)
+        if form in self.entries:
+            self.entries.move_to_end(form)
+            self.hits += 1
+            solved = self.entries[form]
+        else:
+            self.misses += 1
+            sudoku = sdk.Sudoku(form, diag=self.diag)
+            solved = ''.join(sudoku.values[box] for box in sudoku.boxes) if sudoku.search() else None
+            self.entries[form] = solved
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return None if solved is None else transform.restore(solved)
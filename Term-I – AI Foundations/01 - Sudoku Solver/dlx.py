@@ -0,0 +1,190 @@
+"""Exact-cover Sudoku solver using Dancing Links (Knuth's Algorithm X).
+
+A Sudoku is an exact cover problem: every box holds exactly one digit and
+every unit (row, column, square and, for diagonal Sudoku, diagonal) holds
+each digit exactly once. Each candidate (box, digit) is a row of the cover
+matrix that satisfies one box column and one (unit, digit) column per unit
+of the box. `DLXSudoku` searches that matrix instead of the candidate
+values, which gives predictable worst-case behaviour and makes counting
+every solution cheap.
+"""
+from itertools import islice
+
+import sudoku as sdk
+
+class DancingLinks():
+    """Sparse 0/1 matrix with Algorithm X search on dancing links.
+
+    Nodes live in flat lists (left, right, up, down, column, row id) rather
+    than objects. Node 0 is the root and nodes 1..ncols are column headers.
+    """
+
+    def __init__(self, ncols):
+        n = ncols + 1
+        self.L = [i - 1 for i in range(n)]
+        self.R = [i + 1 for i in range(n)]
+        self.L[0], self.R[ncols] = ncols, 0
+        self.U = list(range(n))
+        self.D = list(range(n))
+        self.C = list(range(n))
+        self.S = [0] * n
+        self.row = [None] * n
+
+    def add_row(self, row_id, cols):
+        """Add a row covering the given (0-based) column indices."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        first = None
+        for c in cols:
+            c += 1
+            x = len(C)
+            C.append(c)
+            self.row.append(row_id)
+            U.append(U[c])
+            D.append(c)
+            D[U[c]] = x
+            U[c] = x
+            S[c] += 1
+            if first is None:
+                first = x
+                L.append(x)
+                R.append(x)
+            else:
+                L.append(L[first])
+                R.append(first)
+                R[L[first]] = x
+                L[first] = x
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def search(self, solution=None):
+        """Yield every exact cover as a list of row ids.
+
+        The matrix is left partly covered if the generator is not run to
+        completion, so build a fresh matrix for every search.
+        """
+        if solution is None:
+            solution = []
+        L, R, D, C, S = self.L, self.R, self.D, self.C, self.S
+        if R[0] == 0:
+            yield list(solution)
+            return
+
+        # Choose the column with the fewest rows
+        c = best = R[0]
+        while c != 0:
+            if S[c] < S[best]:
+                best = c
+            c = R[c]
+        if S[best] == 0:
+            return
+
+        self.cover(best)
+        r = D[best]
+        while r != best:
+            solution.append(self.row[r])
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+            for found in self.search(solution):
+                yield found
+            j = L[r]
+            while j != r:
+                self.uncover(C[j])
+                j = L[j]
+            solution.pop()
+            r = D[r]
+        self.uncover(best)
+
+class DLXSudoku():
+    """Initializing and solving a classic/diagonal Sudoku as exact cover.
+
+    Takes the same grid/partial/diag/size arguments as `sudoku.Sudoku` and
+    provides `search()`, `values` and `display()`, plus solution counting.
+    """
+
+    def __init__(self, grid, partial=False, diag=False, size=None):
+        if size is None:
+            size = int(round(len(grid) ** 0.5))
+        if size not in sdk.SIZES or len(grid) != size * size:
+            raise ValueError('expected a grid of 16, 81, 256 or 625 boxes, got {}'.format(len(grid)))
+        self.rows, self.cols, self.digits = sdk.labels(size)
+        self.size = size
+        self.diag = diag
+        self.boxes, self.unitlist, self.units, self.peers = sdk.topology(self.rows, self.cols, diag)
+
+        if partial:
+            self.values = grid.copy()
+        else:
+            self.values = {}
+            for box, char in zip(self.boxes, grid):
+                if char in '.0':
+                    self.values[box] = self.digits
+                elif char in self.digits:
+                    self.values[box] = char
+                else:
+                    raise ValueError('invalid symbol {!r} in grid'.format(char))
+
+    def matrix(self):
+        """Build the cover matrix; row ids are (box, digit) candidates."""
+        nboxes, ndigits = len(self.boxes), len(self.digits)
+        digit_index = {digit: i for i, digit in enumerate(self.digits)}
+        links = DancingLinks(nboxes + len(self.unitlist) * ndigits)
+        for b, box in enumerate(self.boxes):
+            for digit in self.values[box]:
+                d = digit_index[digit]
+                links.add_row((box, digit),
+                              [b] + [nboxes + u * ndigits + d for u in self.units[box]])
+        return links
+
+    def solutions(self):
+        """Yield every solution as a values dictionary."""
+        for rows in self.matrix().search():
+            values = dict(self.values)
+            values.update(rows)
+            yield values
+
+    def search(self):
+        """Solve the sudoku, storing the first solution found in `values`.
+
+        Returns:
+            True if solved, False if the puzzle has no solution.
+        """
+        for values in self.solutions():
+            self.values = values
+            return True
+        return False
+
+    def count_solutions(self, limit=None):
+        """Count the solutions, stopping early once `limit` are found."""
+        return sum(1 for _ in islice(self.matrix().search(), limit))
+
+    def display(self):
+        """Display the values as a 2-D grid."""
+        sdk.Sudoku(self.values, partial=True, diag=self.diag).display()
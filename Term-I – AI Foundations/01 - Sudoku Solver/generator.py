@@ -0,0 +1,154 @@
+"""Generate classic/diagonal Sudoku puzzles with unique solutions.
+
+A random solved grid is built by search with shuffled digit order, then
+clues are removed (in 180-degree symmetric pairs by default) as long as the
+puzzle keeps a unique solution. Each puzzle is graded by the strategies the
+solver needs and by the number of search nodes it visits. Puzzles are fully
+determined by their seed, so corpora are reproducible.
+
+    python generator.py -n 1000 --seed 42 --diag -w 4 > puzzles.txt
+"""
+import argparse
+import random
+import sys
+from collections import namedtuple
+from functools import partial
+
+import sudoku as sdk
+from solution import fan_out
+
+# Grades in increasing difficulty, and the search nodes above which a
+# puzzle that needs search counts as 'expert'
+LEVELS = ('easy', 'medium', 'hard', 'expert')
+EXPERT_NODES = 20
+
+Puzzle = namedtuple('Puzzle', ['seed', 'grid', 'solution', 'clues', 'level', 'nodes'])
+
+def random_fill(sudoku, rng):
+    """Complete a Sudoku by search, trying digits in random order.
+
+    Returns:
+        True if solved, False if the puzzle has no solution.
+    """
+    result = sudoku.reduce_puzzle()
+    if result is not sdk.Result.STALLED:
+        return result is sdk.Result.SOLVED
+    box = sudoku.select_box()
+
+    digits = list(sudoku.values[box])
+    rng.shuffle(digits)
+    for digit in digits:
+        mark = len(sudoku.trail)
+        sudoku.assign_value(box, digit)
+        if random_fill(sudoku, rng):
+            return True
+        sudoku.undo(mark)
+    return False
+
+def random_solution(rng, diag=False, size=9):
+    """Return a random solved grid string."""
+    sudoku = sdk.Sudoku('.' * (size * size), diag=diag)
+    random_fill(sudoku, rng)
+    return ''.join(sudoku.values[box] for box in sudoku.boxes)
+
+def has_other_solution(grid, solution, cells, diag=False):
+    """Test whether `grid` has a solution differing from `solution` in one
+    of `cells` (box indices blanked in `grid`).
+
+    Removing clues from a uniquely solvable puzzle can only add solutions
+    that disagree with the known one in a removed box, so searching for
+    those is a complete uniqueness check that usually fails fast.
+    """
+    for i in cells:
+        sudoku = sdk.Sudoku(grid, diag=diag)
+        box = sudoku.boxes[i]
+        sudoku.assign_value(box, sudoku.values[box].replace(solution[i], ''))
+        if sudoku.search():
+            return True
+    return False
+
+def dig(solution, rng, diag=False, symmetric=True):
+    """Remove clues from a solved grid while the solution stays unique."""
+    n = len(solution)
+    grid = list(solution)
+    cells = list(range(n))
+    rng.shuffle(cells)
+    tried = set()
+    for i in cells:
+        group = sorted({i, n - 1 - i}) if symmetric else [i]
+        if i in tried:
+            continue
+        tried.update(group)
+        candidate = list(grid)
+        for j in group:
+            candidate[j] = '.'
+        if not has_other_solution(''.join(candidate), solution, group, diag):
+            grid = candidate
+    return ''.join(grid)
+
+def grade(grid, diag=False):
+    """Grade a uniquely solvable puzzle.
+
+    Returns:
+        (level, nodes): 'easy' if eliminate/only_choice solve it, 'medium'
+        if naked twins are also needed, otherwise 'hard' or 'expert' by the
+        number of search nodes.
+    """
+    sudoku = sdk.Sudoku(grid, diag=diag)
+    sudoku.propagate()
+    if sudoku.select_box() is None:
+        return 'easy', 0
+    if sudoku.reduce_puzzle() is sdk.Result.SOLVED:
+        return 'medium', 0
+    sudoku.search()
+    return ('hard' if sudoku.nodes <= EXPERT_NODES else 'expert'), sudoku.nodes
+
+def generate(seed, diag=False, size=9, symmetric=True):
+    """Generate and grade the puzzle for a seed.
+
+    Args:
+        seed(int): random seed; the same seed always gives the same puzzle
+        diag(bool): generate a diagonal Sudoku
+        size(int): one of sudoku.SIZES
+        symmetric(bool): remove clues in 180-degree symmetric pairs
+    Returns:
+        A Puzzle.
+    """
+    rng = random.Random(seed)
+    solution = random_solution(rng, diag, size)
+    grid = dig(solution, rng, diag, symmetric)
+    level, nodes = grade(grid, diag)
+    clues = sum(char != '.' for char in grid)
+    return Puzzle(seed, grid, solution, clues, level, nodes)
+
+def generate_many(count, seed=0, workers=None, diag=False, size=9, symmetric=True,
+                  chunksize=4):
+    """Generate the puzzles for seeds seed .. seed+count-1 over a pool of
+    worker processes, yielding them in seed order.
+    """
+    job = partial(generate, diag=diag, size=size, symmetric=symmetric)
+    return fan_out(job, range(seed, seed + count), workers, chunksize)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate graded Sudoku puzzles with unique solutions.')
+    parser.add_argument('-n', '--count', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the first puzzle; puzzle k uses seed+k')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--diag', action='store_true', help='generate diagonal Sudokus')
+    parser.add_argument('--size', type=int, choices=sdk.SIZES, default=9)
+    parser.add_argument('--asymmetric', action='store_true',
+                        help='remove clues one at a time instead of in symmetric pairs')
+    parser.add_argument('--level', choices=LEVELS, action='append',
+                        help='only print puzzles of this grade (repeatable)')
+    args = parser.parse_args(argv)
+
+    for puzzle in generate_many(args.count, args.seed, args.workers, args.diag,
+                                args.size, not args.asymmetric):
+        if args.level is None or puzzle.level in args.level:
+            print('{}\t{}\t{}\t{}'.format(puzzle.grid, puzzle.level, puzzle.nodes, puzzle.seed))
+            sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
@@ -70,8 +70,10 @@ class SudokuSquare:
         self.offsetX = offsetX
         self.offsetY = offsetY
 
-    def draw(self):
-        screen = pygame.display.get_surface()
+    def draw(self, screen=None):
+        """Draw the square on `screen`, by default the display surface."""
+        if screen is None:
+            screen = pygame.display.get_surface()
         AAfilledRoundedRect(screen, (self.offsetX, self.offsetY, 45, 40), self.color)
 
         # screen.blit(self.collide, self.collideRect)
@@ -0,0 +1,180 @@
+"""Serve the Sudoku solver over TCP or a Unix socket.
+
+Clients send one grid per line and get one line back per grid, in the
+order sent, formatted like the solution.py command line:
+
+    grid<TAB>solution, UNSOLVABLE or ERROR ...<TAB>time
+
+Grids are solved by a shared pool of worker processes, so a hard puzzle
+only holds up its own worker. Each connection may have at most
+`max_pending` grids in flight; past that the server stops reading from
+it, which pushes back on the client through the socket. A grid that takes
+longer than `timeout` seconds is answered with a TimeoutError, and a line
+longer than `line_limit` bytes with a ValueError, after which the
+connection is closed. Workers
+stop searching a grid after `max_seconds` (the timeout by default) or
+`max_nodes`, answering with the best partial grid instead, so a hard grid
+can't hold its worker past the timeout.
+
+    python server.py --port 8765 -w 4
+    python server.py --unix /tmp/sudoku.sock
+"""
+import argparse
+import asyncio
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import solution
+
+class SolverServer():
+    """Line-protocol front end dispatching grids to a process pool.
+
+    ATTRIBUTES:
+        pool        : ProcessPoolExecutor running solution.solve_one
+        job         : solve_one with the solver options bound
+        max_pending : grids in flight per connection before reading pauses
+        timeout     : seconds allowed per grid, None for no limit
+        line_limit  : longest request line read, in bytes; pass it as the
+                      `limit` of asyncio.start_server()
+    """
+
+    def __init__(self, workers=None, max_pending=16, timeout=10., engine='dict', diag=True,
+                 method='dfs', max_nodes=None, max_seconds=None, line_limit=4096):
+        self.pool = ProcessPoolExecutor(workers)
+        # The first job forks every worker. Do it before any socket is open:
+        # a worker forked later would hold client connections open after
+        # the server closes them.
+        self.pool.submit(abs, 0).result()
+        if max_seconds is None:
+            max_seconds = timeout
+        budgeted = engine == 'dict' and method == 'dfs'
+        self.job = partial(solution.solve_one, engine=engine, diag=diag, method=method,
+                           max_nodes=max_nodes if budgeted else None,
+                           max_seconds=max_seconds if budgeted else None)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.line_limit = line_limit
+
+    async def solve(self, grid):
+        """Solve a grid in the pool, giving up after the timeout.
+        Only budgeted searches free their worker when they time out; the
+        other engines keep it busy until the search ends.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self.pool, self.job, grid),
+                                          self.timeout)
+        except asyncio.TimeoutError:
+            error = 'TimeoutError: not solved within {}s'.format(self.timeout)
+        except Exception as e:
+            error = '{}: {}'.format(type(e).__name__, e)
+        return solution.SolveResult(grid, None, loop.time() - start, error, None, None)
+
+    async def reject(self, error):
+        """Answer a request that couldn't be read with an error result."""
+        return solution.SolveResult('', None, 0., error, None, None)
+
+    async def handle(self, reader, writer):
+        """Serve one connection: read grids, start solving them, and let
+        respond() write the results back in order.
+        """
+        pending = asyncio.Queue(self.max_pending)
+        responder = asyncio.ensure_future(self.respond(pending, writer))
+        try:
+            while not responder.done():
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The rest of the line is still unread, so answer it
+                    # and stop reading from this client
+                    error = 'ValueError: line longer than {} bytes'.format(self.line_limit)
+                    await pending.put(asyncio.ensure_future(self.reject(error)))
+                    break
+                if not line:
+                    break
+                grid = line.decode('utf-8', 'replace').strip()
+                if grid:
+                    # Blocks while max_pending grids are unanswered
+                    await pending.put(asyncio.ensure_future(self.solve(grid)))
+        finally:
+            if responder.done():
+                # The client went away; drop whatever was queued since
+                while not pending.empty():
+                    pending.get_nowait().cancel()
+            else:
+                await pending.put(None)
+                await responder
+            writer.close()
+
+    async def respond(self, pending, writer):
+        """Write each result as soon as it and every earlier one is ready.
+        If the client goes away, the outstanding grids are cancelled.
+        """
+        while True:
+            task = await pending.get()
+            if task is None:
+                return
+            result = await task
+            try:
+                writer.write((solution.result_line(result) + '\n').encode())
+                await writer.drain()
+            except ConnectionError:
+                break
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+
+    def close(self):
+        self.pool.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the Sudoku solver, one grid per line.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--max-pending', type=int, default=16,
+                        help='grids in flight per connection (default: 16)')
+    parser.add_argument('--timeout', type=float, default=10.,
+                        help='seconds allowed per grid (default: 10)')
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help='search nodes allowed per grid (default: no limit)')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='search time allowed per grid (default: the timeout)')
+    parser.add_argument('--line-limit', type=int, default=4096,
+                        help='longest request line in bytes (default: 4096)')
+    parser.add_argument('-e', '--engine', choices=sorted(solution.ENGINES), default='dict')
+    parser.add_argument('-m', '--method', choices=solution.METHODS, default='dfs')
+    parser.add_argument('--classic', action='store_true',
+                        help='solve classic instead of diagonal Sudokus')
+    args = parser.parse_args(argv)
+
+    server = SolverServer(args.workers, args.max_pending, args.timeout, args.engine,
+                          not args.classic, args.method, args.max_nodes, args.max_seconds,
+                          args.line_limit)
+    limit = server.line_limit
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    if args.unix:
+        start = asyncio.start_unix_server(server.handle, args.unix, limit=limit)
+    else:
+        start = asyncio.start_server(server.handle, args.host, args.port, limit=limit)
+    listener = loop.run_until_complete(start)
+    print('Serving on {}'.format(args.unix or '{}:{}'.format(args.host, args.port)))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        loop.run_until_complete(listener.wait_closed())
+        server.close()
+        loop.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
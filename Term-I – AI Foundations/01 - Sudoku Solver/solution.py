@@ -1,43 +1,306 @@
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+from multiprocessing import Pool
+
 import sudoku as sdk
+from bitsudoku import BitSudoku
+from dlx import DLXSudoku
+
+# Solver engines sharing the Sudoku(grid, partial, diag) interface
+ENGINES = {'dict': sdk.Sudoku, 'bitboard': BitSudoku}
+
+# Search methods: DFS with propagation on the chosen engine, or exact cover
+METHODS = ('dfs', 'dlx')
 
-def naked_twins(values):
+def naked_twins(values, engine='dict'):
     """
     Eliminate values using the naked twins strategy.
     Args:
         values(dict): a dictionary of the form
         {'box_name': '123456789', ...}
+        engine(string): key of ENGINES selecting the solver engine
     Returns:
         the values dictionary with the naked twins eliminated from peers.
     """
-    sudoku = sdk.Sudoku(values, partial=True)
+    sudoku = ENGINES[engine](values, partial=True)
     sudoku.naked_twins()
 
     return sudoku.values
 
-def solve(grid):
+def solve(grid, engine='dict', diag=True, display=True, method='dfs', stats=None,
+          strategies=None, cache=None, budget=None):
     """
     Find the solution to a Sudoku grid.
     Args:
         grid(string): a string representing a sudoku grid.
             Example: '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+        engine(string): key of ENGINES selecting the solver engine
+        diag(bool): solve as a diagonal Sudoku
+        display(bool): print the final grid
+        method(string): 'dfs' to search with the engine, or 'dlx' to solve
+            as exact cover with Dancing Links (engine is then ignored)
+        stats(SolverStats): filled with counters and timings of the search;
+            only the 'dict' engine with method 'dfs' collects them
+        strategies(list): names of sudoku.STRATEGIES to run after
+            propagation, for the 'dict' engine with method 'dfs'
+        cache(PropagationCache): propagated states shared with other solves,
+            for the 'dict' engine with method 'dfs'
+        budget(Budget): node and time limits of the search, for the 'dict'
+            engine with method 'dfs'; sudoku.BudgetExceeded is raised when
+            they run out
     Returns:
         The dictionary representation of the final sudoku grid. False if no solution exists.
     """
-    diagonal_sudoku = sdk.Sudoku(grid, diag=True)
-    diagonal_sudoku.search()
-    diagonal_sudoku.display()
+    custom = (stats is not None or strategies is not None or cache is not None or
+              budget is not None)
+    if custom and (method != 'dfs' or engine != 'dict'):
+        raise ValueError("stats, strategies, cache and budget need the 'dict' engine with method 'dfs'")
+    if method == 'dlx':
+        sudoku = DLXSudoku(grid, diag=diag)
+    elif method == 'dfs':
+        if custom:
+            sudoku = sdk.Sudoku(grid, diag=diag, stats=stats, strategies=strategies,
+                                cache=cache, budget=budget)
+        else:
+            sudoku = ENGINES[engine](grid, diag=diag)
+    else:
+        raise ValueError('unknown method {!r}'.format(method))
+    solved = sudoku.search()
+    if display:
+        sudoku.display()
 
-    return diagonal_sudoku.values
+    return sudoku.values if solved else False
 
-if __name__ == '__main__':
+# Outcome of one puzzle in a batch: the solved grid string (None if the
+# puzzle has no solution), the solve time, and an error message for grids
+# that could not be processed at all. `stats` is the SolverStats.to_dict()
+# of the search when statistics were requested, None otherwise. When the
+# search ran out of budget, `partial` is the grid string of the best state
+# reached ('.' for unsolved boxes) and `error` says which limit ran out.
+SolveResult = namedtuple('SolveResult', ['grid', 'solution', 'seconds', 'error', 'stats',
+                                         'partial'])
+
+# PropagationCache kept by each process for solve_one()
+_cache = None
+
+def process_cache(maxsize):
+    """Return this process's PropagationCache, (re)creating it for `maxsize`."""
+    global _cache
+    if _cache is None or _cache.maxsize != maxsize:
+        _cache = sdk.PropagationCache(maxsize)
+    return _cache
+
+def solve_one(grid, engine='dict', diag=True, method='dfs', stats=False, strategies=None,
+              cache_size=None, max_nodes=None, max_seconds=None):
+    """
+    Solve a single grid without printing and report it as a SolveResult.
+    With a cache_size, propagated states are cached across the grids solved
+    by this process. With max_nodes or max_seconds, the search gives up
+    once either runs out and reports the best partial grid instead.
+    """
+    start = time.perf_counter()
+    solver_stats = sdk.SolverStats() if stats else None
+    cache = process_cache(cache_size) if cache_size else None
+    budget = None
+    if max_nodes is not None or max_seconds is not None:
+        budget = sdk.Budget(max_nodes, max_seconds)
+    solution = partial_grid = error = None
+    try:
+        values = solve(grid, engine=engine, diag=diag, display=False, method=method,
+                       stats=solver_stats, strategies=strategies, cache=cache, budget=budget)
+        solution = ''.join(values.values()) if values else None
+    except sdk.BudgetExceeded as e:
+        best = e.values or {}
+        partial_grid = ''.join(value if len(value) == 1 else '.' for value in best.values()) or grid
+        error = '{}: {}'.format(type(e).__name__, e)
+    except Exception as e:
+        error = '{}: {}'.format(type(e).__name__, e)
+    return SolveResult(grid, solution, time.perf_counter() - start, error,
+                       solver_stats.to_dict() if solver_stats else None, partial_grid)
+
+def solve_many(grids, workers=None, engine='dict', diag=True, chunksize=16, method='dfs',
+               stats=False, strategies=None, cache_size=None, max_nodes=None, max_seconds=None):
+    """
+    Solve an iterable of grids, fanning out to a pool of worker processes.
+    Args:
+        grids: iterable of grid strings
+        workers(int): number of processes; None uses every core, 1 solves
+            in the calling process
+        engine(string): key of ENGINES selecting the solver engine
+        diag(bool): solve as diagonal Sudokus
+        chunksize(int): grids handed to a worker at a time
+        method(string): 'dfs' or 'dlx', as for solve()
+        stats(bool): collect SolverStats for every grid
+        strategies(list): propagation strategies, as for solve()
+        cache_size(int): entries of the PropagationCache each worker shares
+            between its grids; no cache when None
+        max_nodes(int): search nodes allowed per grid; no limit when None
+        max_seconds(float): search time allowed per grid; no limit when None
+    Yields:
+        A SolveResult per grid, in input order, as soon as it is available.
+    """
+    job = partial(solve_one, engine=engine, diag=diag, method=method, stats=stats,
+                  strategies=strategies, cache_size=cache_size, max_nodes=max_nodes,
+                  max_seconds=max_seconds)
+    return fan_out(job, grids, workers, chunksize)
+
+def fan_out(job, items, workers, chunksize):
+    """
+    Yield job(item) for every item (e.g. a grid) in input order, using a
+    process pool unless workers == 1.
+    """
+    if workers == 1:
+        for item in items:
+            yield job(item)
+        return
+
+    with Pool(workers) as pool:
+        for result in pool.imap(job, items, chunksize):
+            yield result
+
+def count_solutions(grid, limit=2, diag=True, method='dfs'):
+    """
+    Count the solutions of a Sudoku grid, stopping once `limit` are found.
+    Args:
+        grid(string): a string representing a sudoku grid
+        limit(int): stop counting at this many solutions; the default of 2
+            is enough to tell unique puzzles apart. None counts them all.
+        diag(bool): count solutions of the diagonal Sudoku
+        method(string): 'dfs' to reuse Sudoku's propagation and search, or
+            'dlx' for exact cover
+    Returns:
+        The number of solutions, at most `limit`.
+    """
+    if method == 'dlx':
+        sudoku = DLXSudoku(grid, diag=diag)
+    elif method == 'dfs':
+        sudoku = sdk.Sudoku(grid, diag=diag)
+    else:
+        raise ValueError('unknown method {!r}'.format(method))
+    return sudoku.count_solutions(limit)
+
+# Outcome of counting the solutions of one puzzle in a batch.
+CountResult = namedtuple('CountResult', ['grid', 'count', 'seconds', 'error'])
+
+def count_one(grid, limit=2, diag=True, method='dfs'):
+    """
+    Count the solutions of a single grid and report it as a CountResult.
+    """
+    start = time.perf_counter()
+    try:
+        count, error = count_solutions(grid, limit, diag, method), None
+    except Exception as e:
+        count, error = None, '{}: {}'.format(type(e).__name__, e)
+    return CountResult(grid, count, time.perf_counter() - start, error)
+
+def count_many(grids, limit=2, workers=None, diag=True, chunksize=16, method='dfs'):
+    """
+    Count the solutions of an iterable of grids over a pool of worker
+    processes, yielding a CountResult per grid in input order. Arguments
+    are as for count_solutions() and solve_many().
+    """
+    job = partial(count_one, limit=limit, diag=diag, method=method)
+    return fan_out(job, grids, workers, chunksize)
+
+def result_line(result):
+    """
+    Format a SolveResult as 'grid<TAB>solution or status<TAB>time', plus
+    the statistics as JSON when they were collected.
+    """
+    if result.partial is not None:
+        status = 'PARTIAL {} {}'.format(result.partial, result.error)
+    elif result.error:
+        status = 'ERROR ' + result.error
+    elif result.solution is None:
+        status = 'UNSOLVABLE'
+    else:
+        status = result.solution
+    line = '{}\t{}\t{:.3f}ms'.format(result.grid, status, 1000 * result.seconds)
+    if result.stats is not None:
+        line += '\t' + json.dumps(result.stats, sort_keys=True)
+    return line
+
+def read_grids(lines):
+    """
+    Yield the grid strings of a puzzle file, skipping blanks and '#' comments.
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve Sudoku puzzles, one grid per line.')
+    parser.add_argument('puzzles', nargs='?',
+                        help="file with one puzzle per line, '-' for stdin; "
+                             "solves a demo grid when omitted")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('-e', '--engine', choices=sorted(ENGINES), default='dict')
+    parser.add_argument('-m', '--method', choices=METHODS, default='dfs')
+    parser.add_argument('--classic', action='store_true',
+                        help='solve classic instead of diagonal Sudokus')
+    parser.add_argument('--count', action='store_true',
+                        help='count solutions instead of solving')
+    parser.add_argument('--limit', type=int, default=2,
+                        help='stop counting at this many solutions (default: 2)')
+    parser.add_argument('--stats', action='store_true',
+                        help='append the search statistics of each grid as JSON')
+    parser.add_argument('-s', '--strategy', choices=sorted(sdk.STRATEGIES), action='append',
+                        help='propagation strategy to run, cheapest first (repeatable; '
+                             'default: naked_twins)')
+    parser.add_argument('--cache', type=int, default=None, metavar='SIZE',
+                        help='cache up to SIZE propagated states per worker')
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help='give up on a grid after this many search nodes')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='give up on a grid after searching this long')
+    args = parser.parse_args(argv)
+
+    if args.puzzles is None:
+        demo()
+        return 0
+
+    source = sys.stdin if args.puzzles == '-' else open(args.puzzles)
+    failures = 0
+    if args.count:
+        with source:
+            for result in count_many(read_grids(source), args.limit, args.workers,
+                                     diag=not args.classic, method=args.method):
+                status = 'ERROR ' + result.error if result.error else result.count
+                failures += result.count != 1
+                print('{}\t{}\t{:.3f}ms'.format(result.grid, status, 1000 * result.seconds))
+        return 1 if failures else 0
+
+    with source:
+        for result in solve_many(read_grids(source), args.workers,
+                                 engine=args.engine, diag=not args.classic,
+                                 method=args.method, stats=args.stats,
+                                 strategies=args.strategy, cache_size=args.cache,
+                                 max_nodes=args.max_nodes, max_seconds=args.max_seconds):
+            failures += result.solution is None
+            print(result_line(result))
+    return 1 if failures else 0
+
+def demo():
     diag_sudoku_grid = '9...6...7.6.971.4...........5.....3.41.....28.7.....6...........9.854.7.5...1...4'
-    solve(diag_sudoku_grid)
+    recorder = sdk.AssignmentRecorder()
+    sudoku = sdk.Sudoku(diag_sudoku_grid, diag=True, recorder=recorder)
+    sudoku.search()
+    sudoku.display()
 
     try:
         from visualize import visualize_assignments
-        visualize_assignments(sdk.assignments)
+        visualize_assignments(recorder)
 
     except SystemExit:
         pass
     except:
         print('Could not visualize your board due to a pygame issue. Not a problem! It is not a requirement.')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,25 @@
 import solution
+import sudoku as sdk
+import asyncio
+import contextlib
+import io
+import json
 import unittest
+from dlx import DLXSudoku
+import generator
+import canonical
+import server
+import os
+import tempfile
+try:
+    import batch
+except ImportError:  # numpy is optional
+    batch = None
+try:
+    import pygame
+    import PySudoku
+except ImportError:  # pygame is optional
+    PySudoku = None
 
 
 class TestNakedTwins(unittest.TestCase):
@@ -94,5 +114,397 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve(self):
         self.assertEqual(solution.solve(self.diagonal_grid), self.solved_diag_sudoku)
 
+
+class TestSolveMany(unittest.TestCase):
+    grids = [TestDiagonalSudoku.diagonal_grid, '1' * 81, '123']
+
+    def test_solve_many(self):
+        for workers in (1, 2):
+            results = list(solution.solve_many(self.grids, workers=workers))
+            self.assertEqual([r.grid for r in results], self.grids)
+            self.assertEqual(results[0].solution,
+                             ''.join(TestDiagonalSudoku.solved_diag_sudoku[box]
+                                     for box in sorted(TestDiagonalSudoku.solved_diag_sudoku)))
+            self.assertIsNone(results[1].solution)
+            self.assertIsNone(results[1].error)
+            self.assertIsNotNone(results[2].error)
+
+    def test_stats(self):
+        hard = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+        result, = solution.solve_many([hard], workers=1, diag=False, stats=True)
+        stats = result.stats
+        self.assertGreater(stats['nodes'], 1)
+        self.assertGreaterEqual(stats['nodes'], stats['max_depth'] + 1)
+        self.assertGreater(stats['eliminations']['eliminate'], 0)
+        self.assertEqual(set(stats['seconds']), {'eliminate', 'only_choice', 'naked_twins', 'search'})
+        self.assertEqual(json.loads(json.dumps(stats)), stats)
+        self.assertIsNone(solution.solve_one(self.grids[0]).stats)
+
+
+class TestCountSolutions(unittest.TestCase):
+
+    def test_count_solutions(self):
+        grid = TestDiagonalSudoku.diagonal_grid
+        for method in solution.METHODS:
+            self.assertEqual(solution.count_solutions(grid, method=method), 1)
+            self.assertEqual(solution.count_solutions(grid, diag=False, method=method), 2)
+            self.assertEqual(solution.count_solutions(grid, limit=7, diag=False, method=method), 7)
+            self.assertEqual(solution.count_solutions(grid, limit=0, method=method), 0)
+            self.assertEqual(solution.count_solutions('.' * 16, limit=None, method=method), 48)
+            self.assertEqual(solution.count_solutions('22' + '.' * 79, method=method), 0)
+
+    def test_count_backtracks_failures_only(self):
+        # Every branch of an empty 4x4 grid leads to solutions
+        stats = sdk.SolverStats()
+        self.assertEqual(sdk.Sudoku('.' * 16, stats=stats).count_solutions(), 288)
+        self.assertGreater(stats.nodes, 288)
+        self.assertEqual(stats.backtracks, 0)
+
+    def test_count_many(self):
+        grids = [TestDiagonalSudoku.diagonal_grid, '22' + '.' * 79, '1']
+        results = list(solution.count_many(grids, workers=2))
+        self.assertEqual([r.count for r in results], [1, 0, None])
+        self.assertIsNotNone(results[2].error)
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_generate(self):
+        for diag in (False, True):
+            puzzle = generator.generate(7, diag=diag)
+            self.assertEqual(puzzle, generator.generate(7, diag=diag))
+            self.assertEqual(solution.count_solutions(puzzle.grid, diag=diag, method='dlx'), 1)
+            self.assertTrue(all(c in '.' + s for c, s in zip(puzzle.grid, puzzle.solution)))
+            self.assertIn(puzzle.level, generator.LEVELS)
+
+    def test_generate_many(self):
+        puzzles = list(generator.generate_many(3, seed=5, workers=2))
+        self.assertEqual([p.seed for p in puzzles], [5, 6, 7])
+        self.assertEqual(puzzles[2], generator.generate(7))
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_shared_between_instances(self):
+        a = sdk.Sudoku(TestDiagonalSudoku.diagonal_grid, diag=True)
+        b = sdk.Sudoku(TestDiagonalSudoku.diagonal_grid, diag=True)
+        self.assertIs(a.peers, b.peers)
+        self.assertIs(a.unitlist, sdk.topology(diag=True).unitlist)
+        self.assertEqual(len(a.unitlist), 29)
+        self.assertEqual(len(a.peers['E5']), 32)
+        self.assertIsNot(a.peers, sdk.Sudoku(TestDiagonalSudoku.diagonal_grid).peers)
+
+
+class TestSizes(unittest.TestCase):
+
+    def assertSolves(self, grid):
+        values = solution.solve(grid, diag=False, display=False)
+        sudoku = sdk.Sudoku(grid)
+        for box, char in zip(sudoku.boxes, grid):
+            if char != '.':
+                self.assertEqual(values[box], char)
+        for unit in sudoku.unitlist:
+            self.assertEqual(sorted(values[box] for box in unit), sorted(sudoku.digits))
+
+    def test_4x4(self):
+        self.assertSolves('1.....3..2.....4')
+
+    def test_16x16(self):
+        self.assertSolves('G' + '.' * 254 + '1')
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, sdk.Sudoku, '.' * 80)
+
+
+class TestReducePuzzle(unittest.TestCase):
+    grid = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+
+    def test_worklist_matches_full_sweeps(self):
+        sweeps = sdk.Sudoku(self.grid)
+        before = None
+        while before != sweeps.values:
+            before = sweeps.values.copy()
+            sweeps.eliminate()
+            sweeps.only_choice()
+
+        worklist = sdk.Sudoku(self.grid)
+        self.assertFalse(worklist.propagate())
+        self.assertEqual(worklist.values, sweeps.values)
+
+    def test_naked_triples(self):
+        values = {box: '123456789' for box in sdk.topology().boxes}
+        values.update(A1='123', A2='123', A3='123')
+        sudoku = sdk.Sudoku(values, partial=True)
+        self.assertTrue(sudoku.naked_subsets(3))
+        self.assertEqual(sudoku.values['A4'], '456789')
+        self.assertEqual(sudoku.values['B1'], '456789')
+        self.assertEqual(sudoku.values['D1'], '123456789')
+        # Nothing changed since the last pass, so no unit is examined
+        self.assertFalse(sudoku.naked_subsets(3))
+
+    def test_split_naked_triple(self):
+        values = {box: '123456789' for box in sdk.topology().boxes}
+        values.update(A1='12', A5='23', A9='13')
+        sudoku = sdk.Sudoku(values, partial=True)
+        self.assertFalse(sudoku.naked_subsets(2))
+        self.assertTrue(sudoku.naked_subsets(3, range(len(sudoku.unitlist))))
+        self.assertEqual(sudoku.values['A2'], '456789')
+        self.assertEqual(sudoku.values['A9'], '13')
+        self.assertEqual(sudoku.values['B1'], '123456789')
+
+    def test_results(self):
+        self.assertIs(sdk.Sudoku(TestDiagonalSudoku.diagonal_grid, diag=True).reduce_puzzle(),
+                      sdk.Result.SOLVED)
+        self.assertIs(sdk.Sudoku(self.grid).reduce_puzzle(), sdk.Result.STALLED)
+        self.assertIs(sdk.Sudoku('11' + '.' * 79).reduce_puzzle(), sdk.Result.CONTRADICTION)
+
+    def test_contradictions(self):
+        row = sdk.topology().unitlist[0]
+        # 9 has no place left in row A
+        sudoku = sdk.Sudoku('.' * 81)
+        for box in row:
+            sudoku.assign_value(box, '12345678')
+        with self.assertRaises(sdk.Contradiction):
+            sudoku.only_choice_unit(row)
+        # 1 and 2 can both only go in A1
+        sudoku = sdk.Sudoku('.' * 81)
+        for box in row:
+            sudoku.assign_value(box, '12' if box == 'A1' else '3456789')
+        with self.assertRaises(sdk.Contradiction):
+            sudoku.only_choice_unit(row)
+
+    def test_propagation_cache(self):
+        cache = sdk.PropagationCache(maxsize=50)
+        first = sdk.Sudoku(self.grid, cache=cache)
+        self.assertTrue(first.search())
+        self.assertEqual(cache.hits, 0)
+        self.assertLessEqual(len(cache.entries), 50)
+
+        second = sdk.Sudoku(self.grid, cache=cache)
+        self.assertIs(second.reduce_puzzle(), sdk.Result.STALLED)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(second.search())
+        self.assertEqual(second.values, first.values)
+
+    def test_pointing_pairs(self):
+        values = {box: '123456789' for box in sdk.topology().boxes}
+        # 1 can only go in A1 or A2 within the top-left square
+        for box in ('A3', 'B1', 'B2', 'B3', 'C1', 'C2', 'C3'):
+            values[box] = '23456789'
+        sudoku = sdk.Sudoku(values, partial=True)
+        self.assertTrue(sudoku.pointing_pairs())
+        self.assertEqual(sudoku.values['A9'], '23456789')
+        self.assertEqual(sudoku.values['D1'], '123456789')
+
+    def test_strategy_pipeline(self):
+        strategies = ('naked_twins', 'hidden_pairs', 'pointing_pairs', 'x_wing')
+        default, stats = sdk.Sudoku(self.grid), sdk.SolverStats()
+        pipeline = sdk.Sudoku(self.grid, strategies=strategies, stats=stats)
+        self.assertTrue(default.search())
+        self.assertTrue(pipeline.search())
+        self.assertEqual(pipeline.values, default.values)
+        self.assertLess(pipeline.nodes, default.nodes)
+        self.assertGreater(sum(stats.progress.values()), 0)
+        with self.assertRaises(ValueError):
+            sdk.Sudoku(self.grid, strategies=['guess'])
+
+
+class TestBudget(unittest.TestCase):
+    grid = '48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....'
+
+    def test_node_budget(self):
+        solved = sdk.Sudoku(self.grid)
+        self.assertTrue(solved.search())
+        budgeted = sdk.Sudoku(self.grid, budget=sdk.Budget(max_nodes=20))
+        with self.assertRaises(sdk.BudgetExceeded) as raised:
+            budgeted.search()
+        e = raised.exception
+        self.assertEqual((e.reason, e.nodes), ('nodes', 21))
+        self.assertEqual(e.solved, sum(len(value) == 1 for value in e.values.values()))
+        self.assertEqual(budgeted.solved, len(budgeted.solved_values()))
+        self.assertGreater(e.solved, 81 - self.grid.count('.'))
+        unlimited = sdk.Sudoku(self.grid, budget=sdk.Budget())
+        self.assertTrue(unlimited.search())
+        self.assertEqual(unlimited.values, solved.values)
+
+    def test_time_budget(self):
+        with self.assertRaises(sdk.BudgetExceeded) as raised:
+            sdk.Sudoku(self.grid, budget=sdk.Budget(max_seconds=0, check_every=1)).search()
+        self.assertEqual(raised.exception.reason, 'seconds')
+
+    def test_partial_result(self):
+        result = solution.solve_one(self.grid, diag=False, max_nodes=20)
+        self.assertIsNone(result.solution)
+        self.assertTrue(result.error.startswith('BudgetExceeded'))
+        self.assertEqual(len(result.partial), 81)
+        self.assertTrue(solution.result_line(result).split('\t')[1].startswith('PARTIAL'))
+
+
+class TestAssignmentRecorder(unittest.TestCase):
+
+    def replay(self, recorder):
+        values = recorder.initial.copy()
+        for box, old, new in recorder.deltas:
+            values[box] = new
+        return {box: value for box, value in values.items() if len(value) == 1}
+
+    def test_deltas_replay_to_solution(self):
+        for recorder in (sdk.AssignmentRecorder(), sdk.AssignmentRecorder(limit=50, ring=True)):
+            sudoku = sdk.Sudoku(TestDiagonalSudoku.diagonal_grid, diag=True, recorder=recorder)
+            sudoku.search()
+            self.assertEqual(self.replay(recorder), TestDiagonalSudoku.solved_diag_sudoku)
+            self.assertLessEqual(len(recorder.deltas), recorder.limit or len(recorder.deltas))
+
+    def test_cap(self):
+        recorder = sdk.AssignmentRecorder(limit=10)
+        sdk.Sudoku(TestDiagonalSudoku.diagonal_grid, diag=True, recorder=recorder).search()
+        self.assertEqual(len(recorder.deltas), 10)
+        self.assertGreater(recorder.dropped, 0)
+
+    @unittest.skipIf(PySudoku is None, 'pygame is not installed')
+    def test_render_replay(self):
+        recorder = sdk.AssignmentRecorder()
+        sdk.Sudoku(TestDiagonalSudoku.diagonal_grid, diag=True, recorder=recorder).search()
+        with tempfile.TemporaryDirectory() as out:
+            frames = PySudoku.render_replay(recorder, os.path.join(out, '{:04d}.bmp'))
+            self.assertEqual(frames, len(recorder.deltas) + 1)
+            self.assertEqual(len(os.listdir(out)), frames)
+
+    @unittest.skipIf(PySudoku is None, 'pygame is not installed')
+    def test_export_grid_errors(self):
+        import visualize
+        with tempfile.TemporaryDirectory() as out:
+            for n, grid in enumerate(('12345', '.' * 16, '11' + '.' * 79)):
+                n, frames, error = visualize.export_grid((n, grid), out, fmt='bmp')
+                self.assertEqual(frames, 0)
+                self.assertEqual(error is None, n == 2)
+            self.assertEqual(os.listdir(out), [])
+
+
+class TestDancingLinks(unittest.TestCase):
+
+    def test_solve(self):
+        self.assertEqual(solution.solve(TestDiagonalSudoku.diagonal_grid, method='dlx'),
+                         TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_count_solutions(self):
+        self.assertEqual(DLXSudoku('.' * 16).count_solutions(), 288)
+        self.assertEqual(DLXSudoku(TestDiagonalSudoku.diagonal_grid, diag=True).count_solutions(), 1)
+        self.assertEqual(DLXSudoku(TestDiagonalSudoku.diagonal_grid).count_solutions(limit=5), 5)
+        self.assertEqual(DLXSudoku('11' + '.' * 79).count_solutions(), 0)
+
+
+class TestBitboardEngine(unittest.TestCase):
+
+    def test_naked_twins(self):
+        self.assertIn(solution.naked_twins(TestNakedTwins.before_naked_twins_1, engine='bitboard'),
+                      TestNakedTwins.possible_solutions_1)
+        self.assertIn(solution.naked_twins(TestNakedTwins.before_naked_twins_2, engine='bitboard'),
+                      TestNakedTwins.possible_solutions_2)
+
+    def test_solve(self):
+        self.assertEqual(solution.solve(TestDiagonalSudoku.diagonal_grid, engine='bitboard'),
+                         TestDiagonalSudoku.solved_diag_sudoku)
+
+
+@unittest.skipIf(batch is None, 'numpy is not installed')
+class TestBatch(unittest.TestCase):
+
+    def test_solve_batch(self):
+        grids = [TestDiagonalSudoku.diagonal_grid, TestReducePuzzle.grid, '1' * 81]
+        expected = [r.solution for r in solution.solve_many(grids, workers=1)]
+        self.assertEqual(batch.solve_batch(grids), expected)
+
+    def test_main_in_chunks(self):
+        grids = [TestDiagonalSudoku.diagonal_grid, '1' * 81, TestDiagonalSudoku.diagonal_grid]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'puzzles.txt')
+            with open(path, 'w') as f:
+                f.write('\n'.join(grids) + '\n')
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(batch.main([path, '--batch', '2']), 1)
+        lines = [line.split('\t') for line in out.getvalue().splitlines()]
+        self.assertEqual([line[0] for line in lines], grids)
+        self.assertEqual(lines[1][1], 'UNSOLVABLE')
+        self.assertEqual(lines[0][1], lines[2][1])
+
+    def test_propagate_matches_sudoku(self):
+        sudoku = sdk.Sudoku(TestReducePuzzle.grid)
+        sudoku.propagate()
+        candidates = batch.encode([TestReducePuzzle.grid])
+        self.assertFalse(batch.propagate(candidates)[0])
+        self.assertEqual(batch.decode(candidates[0], sudoku.boxes), sudoku.values)
+
+
+class TestCanonical(unittest.TestCase):
+    grid = TestReducePuzzle.grid
+
+    def transformed(self, diag=False):
+        rows = canonical.diagonal_permutations(9)[5] if diag else canonical.band_permutations(9)[700]
+        cols = tuple(8 - c for c in rows) if diag else canonical.band_permutations(9)[123]
+        digits = dict(zip('123456789', '917253846'))
+        return canonical.Transform(True, rows, cols, digits)
+
+    def test_invariant(self):
+        for diag in (False, True):
+            form, transform = canonical.canonical(self.grid, diag)
+            self.assertEqual(transform.apply(self.grid), form)
+            self.assertEqual(transform.restore(form), self.grid)
+            other = self.transformed(diag).apply(self.grid)
+            self.assertNotEqual(other, self.grid)
+            self.assertEqual(canonical.canonical(other, diag)[0], form)
+
+    def test_solution_cache(self):
+        cache = canonical.SolutionCache()
+        first = cache.solve(self.grid)
+        other = self.transformed()
+        self.assertEqual(cache.solve(other.apply(self.grid)), other.apply(first))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(len(list(canonical.dedupe([self.grid, other.apply(self.grid)]))), 1)
+
+
+class TestServer(unittest.TestCase):
+    grids = [TestReducePuzzle.grid, TestDiagonalSudoku.diagonal_grid, '123']
+
+    def exchange(self, timeout, grids=grids):
+        async def run():
+            srv = server.SolverServer(workers=1, max_pending=2, timeout=timeout, diag=False,
+                                      line_limit=256)
+            listener = await asyncio.start_server(srv.handle, '127.0.0.1', 0,
+                                                  limit=srv.line_limit)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(''.join(grid + '\n' for grid in grids).encode())
+            writer.write_eof()
+            lines = [line.decode().split('\t') for line in (await reader.read()).splitlines()]
+            writer.close()
+            listener.close()
+            srv.close()
+            return lines
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    def test_responses_in_order(self):
+        lines = self.exchange(timeout=10)
+        self.assertEqual([line[0] for line in lines], self.grids)
+        self.assertEqual(lines[0][1], solution.solve_one(self.grids[0], diag=False).solution)
+        self.assertTrue(lines[2][1].startswith('ERROR ValueError'))
+
+    def test_timeout(self):
+        lines = self.exchange(timeout=0)
+        self.assertTrue(all(line[1].startswith('ERROR TimeoutError') for line in lines))
+
+    def test_line_too_long(self):
+        lines = self.exchange(timeout=10, grids=[self.grids[0], '.' * 1000, self.grids[1]])
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0][0], self.grids[0])
+        self.assertTrue(lines[1][1].startswith('ERROR ValueError: line longer than 256 bytes'))
+
+
 if __name__ == '__main__':
     unittest.main()
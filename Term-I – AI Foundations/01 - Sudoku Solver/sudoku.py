@@ -1,4 +1,313 @@
-assignments = []
+import json
+from collections import Counter, OrderedDict, deque, namedtuple
+from enum import Enum
+from itertools import combinations
+from time import perf_counter
+
+# Boxes, units and peers of a grid shape. `units` maps a box to the indices
+# of its units in `unitlist`. Shared by every solver of that shape, so the
+# tables must be treated as read-only.
+Topology = namedtuple('Topology', ['boxes', 'unitlist', 'units', 'peers'])
+
+# Row labels and digit symbols for grids of up to 25x25
+ROW_LABELS = 'ABCDEFGHIJKLMNOPQRSTUVWXY'
+SYMBOLS = '123456789ABCDEFGHIJKLMNOP'
+SIZES = (4, 9, 16, 25)
+
+# Strategies reduce_puzzle() can run after eliminate/only_choice propagation,
+# by name. Each is called as strategy(sudoku, units) with the indices of the
+# units changed since it last ran and returns True if it reduced any value.
+# Naked subset strategies include the smaller sizes, so pick one of them.
+STRATEGIES = {
+    'naked_twins': lambda sudoku, units: sudoku.naked_subsets(2, units),
+    'naked_triples': lambda sudoku, units: sudoku.naked_subsets(3, units),
+    'naked_quads': lambda sudoku, units: sudoku.naked_subsets(4, units),
+    'hidden_pairs': lambda sudoku, units: sudoku.hidden_pairs(units),
+    'pointing_pairs': lambda sudoku, units: sudoku.pointing_pairs(units),
+    'x_wing': lambda sudoku, units: sudoku.x_wing(),
+}
+DEFAULT_STRATEGIES = ('naked_twins',)
+
+class Result(Enum):
+    """Outcome of Sudoku.reduce_puzzle()."""
+    SOLVED = 'solved'                 # every box holds a single digit
+    STALLED = 'stalled'               # no strategy makes progress; search
+    CONTRADICTION = 'contradiction'   # the values can't be completed
+
+class Contradiction(Exception):
+    """Raised inside propagation as soon as the values can't be completed:
+    a box without candidates, a digit solved twice in a unit, a digit with
+    no place in a unit, or two digits whose only place is the same box.
+    """
+
+class BudgetExceeded(Exception):
+    """Raised by search() and count_solutions() when their Budget runs out.
+    The solver's values are left where the search stopped.
+
+    ATTRIBUTES:
+        reason      : 'nodes' or 'seconds', the limit that ran out
+        values      : copy of the propagated search state with the most
+                      solved boxes seen, or None if no node got that far
+        solved      : number of solved boxes in `values`
+        nodes       : search nodes visited
+        seconds     : wall time since the search started
+    """
+
+    def __init__(self, reason, values, solved, nodes, seconds):
+        super().__init__('{} budget exhausted after {} nodes in {:.3f}s'.format(
+            reason, nodes, seconds))
+        self.reason = reason
+        self.values = values
+        self.solved = solved
+        self.nodes = nodes
+        self.seconds = seconds
+
+_topologies = {}
+
+def labels(size):
+    """Return the default (rows, cols, digits) labels of a size x size grid.
+    Columns are numbered, so past 9 they are a tuple of multi-char labels
+    and boxes read 'A1' ... 'P16'. Digits are single symbols: 1-9 then A-P.
+    """
+    rows = ROW_LABELS[:size]
+    if size <= 9:
+        cols = SYMBOLS[:size]
+    else:
+        cols = tuple(str(c) for c in range(1, size+1))
+    return rows, cols, SYMBOLS[:size]
+
+def cross(A, B):
+    """
+    Cross product of elements in a and b
+    """
+    return [a+b for a in A for b in B]
+
+def topology(rows='ABCDEFGHI', cols='123456789', diag=False):
+    """Return the Topology for a grid shape, building it on first use.
+    Later calls with the same (rows, cols, diag) return the cached tables.
+    """
+    key = (rows, cols, diag)
+    if key not in _topologies:
+        _topologies[key] = build_topology(rows, cols, diag)
+    return _topologies[key]
+
+def build_topology(rows, cols, diag):
+    boxes = cross(rows, cols)
+
+    # Square units are block x block, e.g. 3x3 for a 9x9 grid
+    block = int(round(len(rows) ** 0.5))
+    rowunits = [cross(r,cols) for r in rows]
+    colunits = [cross(rows,[c]) for c in cols]
+    squareunits = [cross(rows[i:i+block], cols[j:j+block])
+                   for i in range(0, len(rows), block) for j in range(0, len(cols), block)]
+
+    unitlist = rowunits + colunits + squareunits
+    if diag:
+        unitlist += [[r+c for r,c in zip(rows,cols)],
+                     [r+c for r,c in zip(rows,cols[::-1])]]
+    unitlist = tuple(tuple(unit) for unit in unitlist)
+
+    units = {box:[] for box in boxes}
+    peers = {box:set() for box in boxes}
+    for i, unit in enumerate(unitlist):
+        for box in unit:
+            units[box].append(i)
+            peers[box].update(unit)
+    units = {box:tuple(u) for box, u in units.items()}
+    peers = {box:frozenset(p - {box}) for box, p in peers.items()}
+    return Topology(boxes, unitlist, units, peers)
+
+class AssignmentRecorder():
+    """Opt-in log of the boxes a Sudoku solver solves or un-solves.
+
+    Changes are kept as compact (box, old, new) deltas on top of the
+    `initial` values instead of full snapshots. Only changes where the old
+    or the new value is a single digit are kept, which is all a replay of
+    the solved boxes needs.
+
+    ATTRIBUTES:
+        limit       : maximum number of deltas kept, None for unbounded
+        ring        : when full, drop the oldest delta (True) or stop
+                      recording (False)
+        initial     : values the deltas apply to
+        deltas      : deque of (box, old, new) tuples
+        dropped     : number of deltas not kept because the log was full
+    """
+
+    def __init__(self, limit=None, ring=False):
+        self.limit = limit
+        self.ring = ring
+        self.initial = {}
+        self.deltas = deque()
+        self.dropped = 0
+
+    def start(self, values):
+        """Reset the log to start from a copy of `values`."""
+        self.initial = values.copy()
+        self.deltas.clear()
+        self.dropped = 0
+
+    def record(self, box, old, new):
+        if self.limit is not None and len(self.deltas) >= self.limit:
+            self.dropped += 1
+            if not self.ring:
+                return
+            # Fold the oldest delta into the initial values
+            oldest_box, _, oldest_new = self.deltas.popleft()
+            self.initial[oldest_box] = oldest_new
+        self.deltas.append((box, old, new))
+
+class SolverStats():
+    """Opt-in counters and timings of a Sudoku solver.
+
+    Wall time is charged to the strategy the solver is running: 'eliminate'
+    and 'only_choice' inside propagate(), the STRATEGIES names in the
+    pipeline and 'search' for branching, undoing and picking boxes. Eliminations count
+    the candidate digits each strategy removed; the digits dropped by
+    branching on a box are charged to 'search'.
+
+    ATTRIBUTES:
+        calls        : Counter of strategy calls ('eliminate' per solved box
+                       processed, 'only_choice' per unit, and one per
+                       pass of each STRATEGIES entry over the changed units)
+        progress     : Counter of the strategy calls that reduced a value
+        eliminations : Counter of candidate digits removed per strategy
+        seconds      : Counter of wall time per strategy
+        nodes        : search nodes visited
+        backtracks   : branches undone after failing
+        max_depth    : deepest search node, 0 for the root
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.progress = Counter()
+        self.eliminations = Counter()
+        self.seconds = Counter()
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+
+    def to_dict(self):
+        """Return the statistics as a dictionary of plain types."""
+        return {'nodes': self.nodes,
+                'backtracks': self.backtracks,
+                'max_depth': self.max_depth,
+                'calls': dict(self.calls),
+                'progress': dict(self.progress),
+                'eliminations': dict(self.eliminations),
+                'seconds': dict(self.seconds),
+                'total_seconds': sum(self.seconds.values())}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+class Budget():
+    """Opt-in node and wall-clock limits of a search, restarted by every
+    root call of search() or count_solutions().
+
+    The clock is only read every `check_every` nodes, so most nodes cost a
+    counter update; a search may overrun max_seconds by that many nodes.
+    Stalled states are offered as the best partial result with their
+    solved box count, and only copied when it beats every state before it.
+
+    ATTRIBUTES:
+        max_nodes   : search nodes allowed, None for no limit
+        max_seconds : wall time allowed, None for no limit
+        check_every : nodes between reads of the clock
+        nodes       : nodes charged since the search started
+        best        : copy of the values with the most solved boxes, or None
+        solved      : solved boxes in `best`
+    """
+
+    def __init__(self, max_nodes=None, max_seconds=None, check_every=64):
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.check_every = check_every
+        self.start()
+
+    def start(self):
+        """Reset the counters and the best state, and start the clock."""
+        self.nodes = 0
+        self.best = None
+        self.solved = -1
+        self.started = perf_counter()
+        self.deadline = None if self.max_seconds is None else self.started + self.max_seconds
+        self.countdown = self.check_every
+
+    def spend(self):
+        """Charge one search node, raising BudgetExceeded once a limit is passed."""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.exceed('nodes')
+        self.countdown -= 1
+        if not self.countdown:
+            self.countdown = self.check_every
+            if self.deadline is not None and perf_counter() > self.deadline:
+                self.exceed('seconds')
+
+    def offer(self, values, solved):
+        """Keep a copy of `values`, which has `solved` solved boxes, if it
+        solves more boxes than the best so far.
+        """
+        if solved > self.solved:
+            self.best, self.solved = values.copy(), solved
+
+    def exceed(self, reason):
+        raise BudgetExceeded(reason, self.best, max(self.solved, 0), self.nodes,
+                             perf_counter() - self.started)
+
+class PropagationCache():
+    """Opt-in bounded LRU cache of reduce_puzzle() outcomes, shared by the
+    solvers of a batch.
+
+    Keys pack the candidates of every box into size bits per box, so
+    equal states from different puzzles (or search branches) share an
+    entry. Each entry is the Result plus the (box, value) changes that
+    reach the propagated state, which a hit replays instead of running
+    propagation and the strategies.
+
+    ATTRIBUTES:
+        maxsize     : number of entries kept; least recently used go first
+        entries     : OrderedDict of key: (Result, changes)
+        hits        : lookups answered from the cache
+        misses      : lookups that had to propagate
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Candidate bitmask of every value string seen so far
+        self.masks = {}
+
+    def key(self, sudoku):
+        """Return the key of a solver's current candidates."""
+        values, masks, size = sudoku.values, self.masks, sudoku.size
+        packed = 0
+        for box in sudoku.boxes:
+            value = values[box]
+            mask = masks.get(value)
+            if mask is None:
+                mask = masks[value] = sum(1 << SYMBOLS.index(digit) for digit in value)
+            packed = (packed << size) | mask
+        nbytes = (len(sudoku.boxes) * size + 7) // 8
+        return sudoku.cache_scope, packed.to_bytes(nbytes, 'big')
+
+    def get(self, key):
+        """Return the (Result, changes) entry for a key, or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
 
 class Sudoku():
     """Initializing and solving a classic/diagnol Sudoku.
@@ -9,79 +318,170 @@ class Sudoku():
         cols        : string '123456789'
         boxes       : list of all squares
         unit_list   : list of all units
+        units       : dictionary of unit indices for each box
         peers       : dictionary of peers for each box
         values      : dictionary of box:digits
+        recorder    : AssignmentRecorder receiving every change, or None
+        stats       : SolverStats collecting counters and timings, or None
+        strategies  : names of the STRATEGIES reduce_puzzle() runs, in order
+        cache       : PropagationCache consulted by reduce_puzzle(), or None
+        budget      : Budget limiting search(), or None
+        nodes       : number of search nodes visited so far
+        solved      : number of boxes currently holding a single digit
     """
 
-    def __init__(self, grid, partial=False, diag=False,rows='ABCDEFGHI', cols='123456789'):
+    def __init__(self, grid, partial=False, diag=False, rows=None, cols=None,
+                 recorder=None, size=None, stats=None, strategies=None, cache=None,
+                 budget=None):
         """
             Args:
-            - grid      : 81-char string to be solved if 'partial = False'
-                          else intermediate solution as a dict of box:values
+            - grid      : size*size-char string to be solved if 'partial = False'
+                          ('.' or '0' for blanks) else intermediate solution
+                          as a dict of box:values
             - partial   : init with string or partial solution
             - diag      : boolean - diagonal Sudoku = True
+            - rows/cols : box labels, defaulting to labels(size)
+            - recorder  : optional AssignmentRecorder; nothing is recorded
+                          by default
+            - size      : one of SIZES; inferred from the grid when None
+            - stats     : optional SolverStats; nothing is measured by
+                          default
+            - strategies: STRATEGIES names to run after propagation,
+                          cheapest first; DEFAULT_STRATEGIES when None
+            - cache     : optional PropagationCache; every state is
+                          propagated by default
+            - budget    : optional Budget; search() is unlimited by
+                          default
 
             Returns:
                 All class attributes initialized
         """
+        if size is None:
+            size = int(round(len(grid) ** 0.5))
+        if size not in SIZES or len(grid) != size * size:
+            raise ValueError('expected a grid of 16, 81, 256 or 625 boxes, got {}'.format(len(grid)))
+        default_rows, default_cols, self.digits = labels(size)
         self.grid = grid
-        self.rows = rows
-        self.cols = cols
+        self.size = size
+        self.rows = rows or default_rows
+        self.cols = cols or default_cols
+        self.recorder = recorder
+        self.stats = stats
+        # Strategy charged for eliminations and time while stats are kept
+        self.strategy = 'search'
+        self.clock = perf_counter()
         self.grid_init(partial, diag)
+        self.strategies = DEFAULT_STRATEGIES if strategies is None else tuple(strategies)
+        for name in self.strategies:
+            if name not in STRATEGIES:
+                raise ValueError('unknown strategy {!r}'.format(name))
+        # Units changed since each strategy last examined them
+        self.pending = {name: set() for name in self.strategies}
+        self.cache = cache
+        self.budget = budget
+        # Solvers only share cache entries with the same grid and strategies
+        self.cache_scope = (self.rows, self.cols, diag, self.strategies)
+        if recorder is not None:
+            recorder.start(self.values)
 
     def cross(self, A, B):
         """
         Cross product of elements in a and b
         """
-        return [a+b for a in A for b in B]
+        return cross(A, B)
 
     def assign_value(self, box, value):
         """Update the values dictionary.
         Assigns a value to a given box. If it updates the board, records it.
+
+        Every change is logged on the trail so search() can undo it, and also
+        feeds the propagation worklist: the units of the box are marked dirty
+        for only_choice(), and a box that becomes solved is queued so its
+        digit gets eliminated from its peers. A box left empty is queued too,
+        so propagate() reports the contradiction.
         """
+        old = self.values[box]
+        if old == value:
+            return
+        self.trail.append((box, old))
         self.values[box] = value
-        if len(value) == 1:
-            assignments.append(self.values.copy())
+        self.dirty_units.update(self.units[box])
+        self.subset_units.update(self.units[box])
+        if len(old) == 1:
+            self.solved -= 1
+        if len(value) < 2:
+            self.queue.append(box)
+            if value:
+                self.solved += 1
+        if self.recorder is not None and (len(value) == 1 or len(old) == 1):
+            self.recorder.record(box, old, value)
+        if self.stats is not None:
+            self.stats.eliminations[self.strategy] += len(old) - len(value)
 
     def grid_init(self, partial, diag):
         """Setup the grid and initialize difference parameters.
         i.e. Boxes, Values, Peers.
         """
-        self.boxes = self.cross(self.rows,self.cols)
+        self.boxes, self.unitlist, self.units, self.peers = topology(self.rows, self.cols, diag)
 
         if partial:
             self.values = self.grid.copy()
         else:
             self.values = {}
             for box,char in zip(self.boxes,self.grid):
-                if char == '.':
-                    self.values[box] = self.cols
-                else:
+                if char in '.0':
+                    self.values[box] = self.digits
+                elif char in self.digits:
                     self.values[box] = char
+                else:
+                    raise ValueError('invalid symbol {!r} in grid'.format(char))
 
-        rowunits = [self.cross(r,self.cols) for r in self.rows]
-        colunits = [self.cross(self.rows,c) for c in self.cols]
-        squareunits = [self.cross(rs, cs) for rs in ['ABC','DEF','GHI'] for cs in ['123','456','789']]
+        # Propagation worklist: every given is pending and every unit is dirty
+        self.queue = deque(self.solved_values())
+        self.solved = len(self.queue)
+        self.dirty_units = set(range(len(self.unitlist)))
+        # Units changed since naked_subsets() last looked at them
+        self.subset_units = set(range(len(self.unitlist)))
+        # Undo log of (box, previous value) for every assignment
+        self.trail = []
+        # Search nodes visited by search() and count_solutions()
+        self.nodes = 0
 
-        self.unitlist = rowunits + colunits + squareunits
-        if diag:
-            self.unitlist += [[r+c for r,c in zip(self.rows,self.cols)],
-                              [r+c for r,c in zip(self.rows,self.cols[::-1])]]
+    def switch(self, strategy):
+        """Charge the time since the last switch to the current strategy and
+        start timing `strategy`. Only called while stats are kept.
+        """
+        now = perf_counter()
+        self.stats.seconds[self.strategy] += now - self.clock
+        self.strategy, self.clock = strategy, now
 
-        units = {box:[u for u in self.unitlist if box in u] for box in self.boxes}
-        self.peers = {box:set(sum(units[box],[]))-set([box]) for box in self.boxes}
+    def undo(self, mark):
+        """Roll the values back to when the trail had `mark` entries.
+        Pending propagation work belongs to the abandoned state and is dropped.
+        """
+        values, trail, recorder = self.values, self.trail, self.recorder
+        while len(trail) > mark:
+            box, value = trail.pop()
+            self.solved += (len(value) == 1) - (len(values[box]) == 1)
+            self.subset_units.update(self.units[box])
+            if recorder is not None and (len(value) == 1 or len(values[box]) == 1):
+                recorder.record(box, values[box], value)
+            values[box] = value
+        self.queue.clear()
+        self.dirty_units.clear()
 
     def display(self):
         """Display the values as a 2-D grid.
         Args:
             values(dict): The sudoku in dictionary form
         """
+        block = int(round(self.size ** 0.5))
         width = 1+max(len(self.values[s]) for s in self.boxes)
-        line = '+'.join(['-'*(width*3)]*3)
-        for r in self.rows:
-            print(''.join(self.values[r+c].center(width)+('|' if c in '36' else '')
-                      for c in self.cols))
-            if r in 'CF': print(line)
+        line = '+'.join(['-'*(width*block)]*block)
+        for i, r in enumerate(self.rows):
+            print(''.join(self.values[r+c].center(width)+('|' if j % block == block-1 and j < self.size-1 else '')
+                      for j, c in enumerate(self.cols)))
+            if i % block == block-1 and i < self.size-1: print(line)
         print('\n')
 
     def solved_values(self):
@@ -115,34 +515,89 @@ class Sudoku():
         Input: Sudoku in dictionary form.
         Output: Resulting Sudoku in dictionary form after filling in only
         choices.
+        Raises Contradiction if a unit can't hold every digit.
         """
         for unit in self.unitlist:
-            for digit in self.cols:
-                boxes_containing_digit =[box for box in unit if digit in self.values[box]]
-                if len(boxes_containing_digit) == 1:
-                    self.assign_value(boxes_containing_digit[0], digit)
+            self.only_choice_unit(unit)
+
+    def only_choice_unit(self, unit):
+        """Apply only_choice() to a single unit.
+
+        A single pass over the unit records, per digit, the one box holding
+        it (or None once a second box is seen), instead of scanning the unit
+        once for every digit.
+
+        Raises:
+            Contradiction if a digit has no place in the unit, or if two
+            digits can only go in the same box.
+        """
+        values = self.values
+        places = {}
+        for box in unit:
+            for digit in values[box]:
+                places[digit] = None if digit in places else box
+        if len(places) < len(unit):
+            raise Contradiction('a digit has no place in unit {}'.format(unit[0]))
+        for digit, box in places.items():
+            if box is not None:
+                if digit not in values[box]:
+                    # Already given the only digit of another unit member
+                    raise Contradiction('{} is the only place for two digits'.format(box))
+                self.assign_value(box, digit)
 
     #Naked-Twins Stragtegy
-    def find_naked_twins(self):
-        twins = [[a for a in u
-                        for b in u
-                            if (a != b) and (len(self.values[a]) == 2)
-                                        and (self.values[a] == self.values[b])
-                 ]
-                 for i,u in enumerate(self.unitlist)
-                ]
-        return twins
-
-    def eliminate_naked_twins(self, twins):
-        for i, twin in enumerate(twins):
-            if twin:
-                for box in self.unitlist[i]:
-                    if box not in twin:
-                        for digit in self.values[twin[0]]:
-                            value = self.values[box]
-                            if len(value) > 1 :
-                                value = value.replace(digit,'')
-                                self.assign_value(box, value)
+    def naked_subsets(self, max_size=2, units=None):
+        """Eliminate values using naked pairs (twins), triples, ... up to
+        `max_size` digits.
+
+        When k unsolved boxes of a unit hold only k digits between them,
+        e.g. the triple {12, 23, 13}, those digits can't go anywhere else in
+        the unit and are removed from its other unsolved boxes. Pairs are
+        found in a linear scan by grouping the boxes on their value. Larger
+        subsets try every combination of k boxes with at most k candidates,
+        up to C(n, k) per unit, which adds up on 16x16 and 25x25 grids.
+        Only units changed since the last call are examined unless the unit
+        indices are given.
+
+        Returns:
+            True if any value was reduced, False otherwise.
+        """
+        values, unitlist = self.values, self.unitlist
+        if units is None:
+            units, self.subset_units = self.subset_units, set()
+        changed = False
+        for u in units:
+            unit = unitlist[u]
+            groups = {}
+            for box in unit:
+                if len(values[box]) == 2:
+                    groups.setdefault(values[box], []).append(box)
+            for value, subset in groups.items():
+                if len(subset) == 2 and all(values[box] == value for box in subset):
+                    changed |= self.eliminate_subset(unit, subset, value)
+            for size in range(3, max_size + 1):
+                members = [box for box in unit if 1 < len(values[box]) <= size]
+                for subset in combinations(members, size):
+                    digits = set(''.join(values[box] for box in subset))
+                    if len(digits) == size and all(len(values[box]) > 1 for box in subset):
+                        changed |= self.eliminate_subset(unit, subset, digits)
+        return changed
+
+    def eliminate_subset(self, unit, subset, digits):
+        """Remove `digits` from the unsolved boxes of `unit` outside `subset`.
+
+        Returns:
+            True if any value was reduced, False otherwise.
+        """
+        changed = False
+        for box in unit:
+            current = self.values[box]
+            if len(current) > 1 and box not in subset:
+                reduced = ''.join(d for d in current if d not in digits)
+                if reduced != current:
+                    self.assign_value(box, reduced)
+                    changed = True
+        return changed
 
     def naked_twins(self):
         """Eliminate values using the naked twins strategy.
@@ -150,60 +605,301 @@ class Sudoku():
             values(dict): a dictionary of the form {'box_name': '123456789', ...}
 
         Returns:
-            the values dictionary with the naked twins eliminated from peers.
+            True if any value was reduced, False otherwise.
         """
-        #Find all instances of naked twins
-        twins = self.find_naked_twins()
-        #Eliminate the naked twins as possibilities for their units
-        self.eliminate_naked_twins(twins)
+        return self.naked_subsets(2)
 
-    def reduce_puzzle(self):
-        """Iterate eliminate() and only_choice().
-        If at some point, there is a box with no available values, return False.
+    def hidden_pairs(self, units=None):
+        """Eliminate values using hidden pairs.
+
+        When two digits of a unit can only go in the same two boxes, those
+        boxes can't hold any other digit.
+
+        Args:
+            units: indices of the units to examine, all units when None
+        Returns:
+            True if any value was reduced, False otherwise.
+        """
+        values, unitlist = self.values, self.unitlist
+        changed = False
+        for u in range(len(unitlist)) if units is None else units:
+            places = {}
+            for box in unitlist[u]:
+                for digit in values[box]:
+                    places.setdefault(digit, []).append(box)
+            pairs = {}
+            for digit, boxes in places.items():
+                if len(boxes) == 2:
+                    pairs.setdefault(tuple(boxes), []).append(digit)
+            for boxes, digits in pairs.items():
+                if len(digits) != 2:
+                    continue
+                for box in boxes:
+                    if len(values[box]) > 2:
+                        self.assign_value(box, ''.join(d for d in values[box] if d in digits))
+                        changed = True
+        return changed
 
-        If the sudoku is solved, return the sudoku.
-        If after an iteration of both functions, the sudoku remains the same,
-        return the sudoku.
+    def pointing_pairs(self, units=None):
+        """Eliminate values using pointing pairs and box/line reduction.
 
-        Input: A sudoku in dictionary form.
-        Output: The resulting sudoku in dictionary form.
+        When every place for a digit in one unit also lies in a second unit
+        (e.g. a square and a row), the digit must go in the overlap and is
+        removed from the rest of the second unit.
+
+        Args:
+            units: indices of the units to examine, all units when None
+        Returns:
+            True if any value was reduced, False otherwise.
         """
-        stalled = False
-        while not stalled:
-            solved_values_before = self.solved_values()
-            self.eliminate()
-            self.only_choice()
-            solved_values_after = self.solved_values()
+        values, unitlist, box_units = self.values, self.unitlist, self.units
+        changed = False
+        for u in range(len(unitlist)) if units is None else units:
+            places = {}
+            for box in unitlist[u]:
+                for digit in values[box]:
+                    places.setdefault(digit, []).append(box)
+            for digit, boxes in places.items():
+                if len(boxes) < 2:
+                    continue
+                shared = set(box_units[boxes[0]]).intersection(*(box_units[box] for box in boxes[1:]))
+                shared.discard(u)
+                for other in shared:
+                    for box in unitlist[other]:
+                        if digit in values[box] and box not in boxes:
+                            self.assign_value(box, values[box].replace(digit, ''))
+                            changed = True
+        return changed
+
+    def x_wing(self):
+        """Eliminate values using X-wings.
 
-            stalled = solved_values_before == solved_values_after
+        When a digit can only go in the same two columns in two rows, it
+        fills those columns from these rows and is removed from the rest of
+        the two columns; likewise with rows and columns swapped.
 
-            if len([box for box in self.boxes if len( self.values[box]) == 0]):
-                # if it is still solvable run naked_twins or not
-                self.naked_twins()
-                return True
+        Returns:
+            True if any value was reduced, False otherwise.
+        """
+        values, unitlist, size = self.values, self.unitlist, self.size
+        changed = False
+        # Rows are units 0..size-1 and columns size..2*size-1
+        for lines, crosses in ((unitlist[:size], unitlist[size:2*size]),
+                               (unitlist[size:2*size], unitlist[:size])):
+            for digit in self.digits:
+                wings = {}
+                for i, line in enumerate(lines):
+                    spots = [j for j, box in enumerate(line) if digit in values[box]]
+                    if len(spots) == 2:
+                        wings.setdefault(tuple(spots), []).append(i)
+                for spots, found in wings.items():
+                    if len(found) != 2:
+                        continue
+                    for j in spots:
+                        for i, box in enumerate(crosses[j]):
+                            if i not in found and digit in values[box]:
+                                self.assign_value(box, values[box].replace(digit, ''))
+                                changed = True
+        return changed
+
+    def propagate(self):
+        """Run eliminate and only_choice from the worklist to a fixpoint.
+
+        Only the peers of newly solved boxes and the units whose boxes
+        changed since the last fixpoint are revisited (AC-3 style), which
+        reaches the same fixpoint as full eliminate()/only_choice() sweeps.
+
+        Contradictions are caught as they appear: a box left empty by any
+        change, a solved digit that a peer also holds as its only value, and
+        the unit checks of only_choice_unit().
+
+        Returns:
+            True if the values hit a contradiction (failed), False otherwise.
+        """
+        try:
+            self.propagate_or_raise()
+        except Contradiction:
+            return True
         return False
 
-    def search(self):
+    def propagate_or_raise(self):
+        """Body of propagate(), raising Contradiction on failure."""
+        values, peers, unitlist = self.values, self.peers, self.unitlist
+        queue, dirty_units, stats = self.queue, self.dirty_units, self.stats
+        while queue or dirty_units:
+            if stats is not None and queue:
+                self.switch('eliminate')
+            while queue:
+                box = queue.popleft()
+                digit = values[box]
+                if len(digit) != 1:
+                    if not digit:
+                        raise Contradiction('{} has no candidates'.format(box))
+                    continue
+                if stats is not None:
+                    stats.calls['eliminate'] += 1
+                for peer in peers[box]:
+                    value = values[peer]
+                    if digit in value:
+                        if value == digit:
+                            raise Contradiction('{} is in both {} and {}'.format(digit, box, peer))
+                        self.assign_value(peer, value.replace(digit,''))
+            if dirty_units:
+                if stats is not None:
+                    self.switch('only_choice')
+                    stats.calls['only_choice'] += 1
+                self.only_choice_unit(unitlist[dirty_units.pop()])
+
+    def reduce_puzzle(self):
+        """Propagate eliminate() and only_choice(), then run the strategies
+        in order on the units that changed, until the puzzle stalls.
+        As soon as a strategy reduces a value, propagation runs again before
+        any later (more expensive) strategy.
+        Propagation stops at the first contradiction. With a cache, a state
+        seen before skips all of this and replays the cached outcome.
+
+        Returns:
+            Result.CONTRADICTION, Result.SOLVED or Result.STALLED.
+        """
+        cache = self.cache
+        if cache is None:
+            return self.run_strategies()
+
+        key = cache.key(self)
+        entry = cache.get(key)
+        if entry is not None:
+            result, changes = entry
+            for box, value in changes:
+                self.assign_value(box, value)
+            # The cached state is a fixpoint, so nothing is left to revisit
+            self.queue.clear()
+            self.dirty_units.clear()
+            self.subset_units.clear()
+            for units in self.pending.values():
+                units.clear()
+            return result
+
+        mark = len(self.trail)
+        result = self.run_strategies()
+        changes = ()
+        if result is not Result.CONTRADICTION:
+            changed = {box for box, _ in self.trail[mark:]}
+            changes = tuple((box, self.values[box]) for box in changed)
+        cache.put(key, (result, changes))
+        return result
+
+    def run_strategies(self):
+        """Body of reduce_puzzle() without the cache."""
+        stats, pending = self.stats, self.pending
+        try:
+            while True:
+                if self.propagate():
+                    return Result.CONTRADICTION
+                changed, self.subset_units = self.subset_units, set()
+                for units in pending.values():
+                    units |= changed
+                for name in self.strategies:
+                    units, pending[name] = pending[name], set()
+                    if stats is not None:
+                        self.switch(name)
+                        stats.calls[name] += 1
+                    if STRATEGIES[name](self, units):
+                        if stats is not None:
+                            stats.progress[name] += 1
+                        break
+                else:
+                    values = self.values
+                    if all(len(values[box]) == 1 for box in self.boxes):
+                        return Result.SOLVED
+                    return Result.STALLED
+        finally:
+            if stats is not None:
+                self.switch('search')
+
+    def select_box(self):
+        """Return the unsolved box with the fewest possibilities, or None
+        if every box is solved.
+        """
+        unsolved = [(len(self.values[box]),box) for box in self.boxes if len(self.values[box]) > 1]
+        if not unsolved:
+            return None
+        n, box = min(unsolved)
+        return box
+
+    def search(self, depth=0):
         """Using depth-first search and propagation,
         create a search tree and solve the sudoku.
+        With a budget, raises BudgetExceeded once it runs out.
         """
+        self.nodes += 1
+        self.count_node(depth)
         # Reduce the puzzle
-        failed = self.reduce_puzzle()
-        if failed :
+        result = self.reduce_puzzle()
+        if result is Result.CONTRADICTION:
             return False #Tree-leaf: not a solution
-        if all(len(self.values[box]) == 1 for box in self.boxes):
-            return True #Solved
-
-        # Choose box with min possibilities
-        n, box = min((len(self.values[box]),box) for box in self.boxes if len(self.values[box]) > 1)
+        if result is Result.SOLVED:
+            return True
+        if self.budget is not None:
+            self.budget.offer(self.values, self.solved)
+        box = self.select_box()
 
         # Recursion to solve each one of the resulting sudokus,
         # and if one returns a value (not False), return that answer!
         for digit in self.values[box]:
-            tmp = self.values.copy() # copy of the values in case of failure = 'attempt ===False'
-            self.values[box] = digit
-            attempt = self.search()
+            mark = len(self.trail) # trail position to roll back to on failure
+            self.assign_value(box, digit)
+            attempt = self.search(depth + 1)
             if attempt:
                 return attempt
             else:
-                self.values = tmp
+                self.undo(mark)
+                if self.stats is not None:
+                    self.stats.backtracks += 1
+
+    def count_node(self, depth):
+        """Record a search node at `depth` in the stats, if kept, and charge
+        it to the budget, if any. Timing starts at the root node.
+        """
+        budget = self.budget
+        if budget is not None:
+            if depth == 0:
+                budget.start()
+            budget.spend()
+        stats = self.stats
+        if stats is not None:
+            if depth == 0:
+                self.strategy, self.clock = 'search', perf_counter()
+            stats.nodes += 1
+            if depth > stats.max_depth:
+                stats.max_depth = depth
+
+    def count_solutions(self, limit=None, depth=0):
+        """Count the solutions with the same propagation and search as
+        search(), stopping as soon as `limit` solutions have been found.
+        Values are left at the propagated starting state. With a budget,
+        raises BudgetExceeded once it runs out.
+
+        Returns:
+            The number of solutions, at most `limit`.
+        """
+        if limit == 0:
+            return 0
+        self.nodes += 1
+        self.count_node(depth)
+        result = self.reduce_puzzle()
+        if result is not Result.STALLED:
+            return int(result is Result.SOLVED)
+        box = self.select_box()
+
+        count = 0
+        for digit in self.values[box]:
+            mark = len(self.trail)
+            self.assign_value(box, digit)
+            found = self.count_solutions(None if limit is None else limit - count, depth + 1)
+            count += found
+            self.undo(mark)
+            if self.stats is not None and not found:
+                self.stats.backtracks += 1
+            if limit is not None and count >= limit:
+                break
+        return count
@@ -1,17 +1,81 @@
-from PySudoku import play
+import argparse
+import os
+import sys
+from functools import partial
 
-def visualize_assignments(assignments):
+from PySudoku import play, render_replay
+import sudoku as sdk
+from solution import fan_out, read_grids
+
+def assignment_frames(recorder):
+    """Replay the (box, old, new) deltas of a sudoku.AssignmentRecorder and
+    return the board after every delta that solves a box."""
+    values = recorder.initial.copy()
+    frames = []
+    for box, old, new in recorder.deltas:
+        values[box] = new
+        if len(new) == 1:
+            frames.append(values.copy())
+    return frames
+
+def visualize_assignments(recorder):
     """ Visualizes the set of assignments created by the Sudoku AI"""
-    last_assignment = None
-    filtered_assignments = []
-
-    for i in range(len(assignments)):
-        if last_assignment:
-            last_assignment_items = [item for item in last_assignment.items() if len(item[1]) == 1]
-            current_assignment_items = [item for item in assignments[i].items() if len(item[1]) == 1]
-            shared_items = set(last_assignment_items) & set(current_assignment_items)
-            if len(shared_items) < len(current_assignment_items):
-                filtered_assignments.append(assignments[i])
-        last_assignment = assignments[i]
-
-    play(filtered_assignments)
+    play(assignment_frames(recorder))
+
+def export_assignments(recorder, path, fps=5):
+    """Render the assignments to an animated GIF or an image sequence
+    without a display; see PySudoku.render_replay."""
+    return render_replay(recorder, path, fps)
+
+def export_grid(item, out, fmt='gif', diag=True, fps=5):
+    """Solve the numbered grid item = (n, grid) and export its replay to
+    out/<n>.gif, or to out/<n>/<frame>.<fmt> for fmt 'png' or 'bmp'.
+    Only 9x9 grids can be rendered.
+
+    Returns:
+        (n, number of frames, error), with 0 frames if the grid has no
+        solution, and the error as a string if it couldn't be exported.
+    """
+    n, grid = item
+    try:
+        if len(grid) != 81:
+            raise ValueError('expected a 9x9 grid of 81 boxes, got {}'.format(len(grid)))
+        recorder = sdk.AssignmentRecorder()
+        if not sdk.Sudoku(grid, diag=diag, recorder=recorder).search():
+            return n, 0, None
+        if fmt == 'gif':
+            path = os.path.join(out, '{:05d}.gif'.format(n))
+        else:
+            os.makedirs(os.path.join(out, '{:05d}'.format(n)), exist_ok=True)
+            path = os.path.join(out, '{:05d}'.format(n), '{:04d}.' + fmt)
+        return n, export_assignments(recorder, path, fps), None
+    except Exception as e:
+        return n, 0, '{}: {}'.format(type(e).__name__, e)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export solve replays of 9x9 puzzles without a display.')
+    parser.add_argument('puzzles', help="file with one puzzle per line, '-' for stdin")
+    parser.add_argument('-o', '--out', default='replays', help='output directory (default: replays)')
+    parser.add_argument('-f', '--format', choices=('gif', 'png', 'bmp'), default='gif',
+                        help='animated GIF (needs Pillow) or an image per frame')
+    parser.add_argument('--fps', type=int, default=5)
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--classic', action='store_true',
+                        help='solve classic instead of diagonal Sudokus')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    source = sys.stdin if args.puzzles == '-' else open(args.puzzles)
+    job = partial(export_grid, out=args.out, fmt=args.format, diag=not args.classic, fps=args.fps)
+    with source:
+        for n, frames, error in fan_out(job, enumerate(read_grids(source)), args.workers, 1):
+            if error:
+                status = 'ERROR ' + error
+            else:
+                status = '{} frames'.format(frames) if frames else 'UNSOLVABLE'
+            print('{}\t{}'.format(n, status))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,7 @@ strength using `tournament.py` and include the results in your report.
 
 import random
 import math
+from collections import namedtuple
 
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
@@ -189,6 +190,73 @@ def custom_score(game, player):
     # return normalized_moves(game, player)
 
 
+# A transposition table entry: the search `depth` below the position, the
+# kind of `bound` the `score` is, and the best move found
+TableEntry = namedtuple('TableEntry', ['key', 'depth', 'bound', 'score', 'move'])
+
+# XORed into the table key of a player searching as player 2. Scores are from
+# the searching player's side, so a table shared across games must not mix up
+# the results of the same position searched from either seat.
+SEAT_KEY = random.Random(2).getrandbits(64)
+
+class TranspositionTable:
+    """Bounded table of alpha-beta results keyed by `Board.hash()` and the
+    searching player's seat (see SEAT_KEY), so positions reached again (by
+    transposition, or by the next iteration of iterative deepening) are not
+    searched twice.
+
+    Each key maps to one of `size` slots. When two positions share a slot,
+    the replacement policy picks the one kept.
+
+    PARAMETERS:
+        size :: int (optional)
+            Number of slots.
+
+        replacement :: {'depth', 'always'} (optional)
+            'depth' keeps the entry searched deeper, 'always' keeps the
+            newest.
+
+    ATTRIBUTES:
+        hits :: int
+            Lookups that found an entry for the position.
+
+        probes :: int
+            Lookups made.
+    """
+    EXACT, LOWER, UPPER = 'exact', 'lower', 'upper'
+    REPLACEMENTS = ('depth', 'always')
+
+    def __init__(self, size=1 << 16, replacement='depth'):
+        if replacement not in TranspositionTable.REPLACEMENTS:
+            raise ValueError('unknown replacement policy {!r}'.format(replacement))
+        self.size = size
+        self.replacement = replacement
+        self.slots = [None] * size
+        self.hits = 0
+        self.probes = 0
+
+    def lookup(self, key):
+        """Returns the TableEntry of a position, or None."""
+        self.probes += 1
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """Records a search result unless the replacement policy keeps the
+        entry already in its slot."""
+        slot = key % self.size
+        entry = self.slots[slot]
+        if (entry is None or self.replacement == 'always' or entry.key == key or
+                depth >= entry.depth):
+            self.slots[slot] = TableEntry(key, depth, bound, score, move)
+
+    def clear(self):
+        self.slots = [None] * self.size
+
+
 class CustomPlayer:
     """Game-playing agent that chooses a move using your evaluation function
     and a depth-limited minimax algorithm with alpha-beta pruning. You must
@@ -218,16 +286,50 @@ class CustomPlayer:
             Time remaining (in milliseconds) when search is aborted. Should be
             a positive value large enough to allow the function to return
             before the timer expires.
+
+        inplace :: boolean (optional)
+            Flag indicating whether to search by applying and undoing moves
+            on the game passed to get_move() (True), which needs a board with
+            undo_move(), instead of copying it with forecast_move() at every
+            node (False).
+
+        table :: TranspositionTable (optional)
+            Table of results alpha-beta consults and fills, kept across
+            calls to get_move(); None to search without one.
+
+        ordering :: boolean (optional)
+            Flag indicating whether alpha-beta tries the most promising moves
+            first: the principal variation of the previous search, then the
+            table's best move, killer moves and moves with a high history
+            score (True), or the moves in board order (False). With
+            iterative deepening, root moves are also tried in the order of
+            their scores in the previous iteration.
+
+    ATTRIBUTES:
+        cutoffs :: int
+            Alpha-beta nodes pruned after some of their moves were searched.
+
+        first_move_cutoffs :: int
+            Cutoffs caused by the first move searched; see cutoff_rate().
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10., inplace=False,
+                 table=None, ordering=False):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.inplace = inplace
+        self.table = table
+        self.ordering = ordering
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Plies below the root of the current search
+        self.ply = 0
+        self.reset_ordering()
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -256,9 +358,14 @@ class CustomPlayer:
         (int, int)
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
+
+        When an alpha-beta iteration times out after searching the best move
+        of the previous iteration, the best move it found so far is returned
+        instead, since it scores at least as well at the deeper depth.
         """
 
         self.time_left = time_left
+        self.reset_ordering()
 
         if not legal_moves:
             return (-1, -1)
@@ -279,9 +386,110 @@ class CustomPlayer:
                 _, move = algorithm_name(game, self.search_depth)
         except Timeout:
             # Return the best move so far in-case of time-out.
-            return move
+            return self.partial_move(move, legal_moves)
+        return move
+
+    def partial_move(self, move, legal_moves):
+        """Returns the move to play when the search timed out: the best
+        root move of the interrupted iteration if it searched `move`, the
+        best move of the last completed iteration, or failing both the
+        best root move searched at all."""
+        results = self.root_results
+        if results and (move is None or any(m == move for m, _ in results)):
+            pick = max if self.root_maximizing else min
+            return pick(results, key=lambda result: result[1])[0]
+        if move is None:
+            return legal_moves[0]
         return move
 
+    def search_move(self, search, game, move, *args):
+        """Returns search(child, *args) for the child state reached by
+        playing `move`. In place, the move is undone again even when the
+        search times out, so the game is left as it was passed in."""
+        self.ply += 1
+        try:
+            if not self.inplace:
+                return search(game.forecast_move(move), *args)
+            game.apply_move(move)
+            try:
+                return search(game, *args)
+            finally:
+                game.undo_move()
+        finally:
+            self.ply -= 1
+
+    def reset_ordering(self):
+        """Forget the principal variation, killer moves and history scores,
+        which only apply to the position they were found in."""
+        # Best line of the last completed search, and the lines found below
+        # each ply of the current one
+        self.pv = ()
+        self.pv_table = []
+        # Whether the moves played so far follow self.pv
+        self.follow_pv = False
+        # Per ply, the last two moves that caused a cutoff
+        self.killers = []
+        # (ply parity, move): credit for cutoffs, by depth searched below
+        self.history = {}
+        # (move, score) of the root moves searched by the current alpha-beta
+        # iteration, and the scores of the last completed one
+        self.root_results = []
+        self.root_scores = {}
+        self.root_maximizing = True
+        # SEAT_KEY when searching as player 2, else 0; see alphabeta()
+        self.seat_key = 0
+
+    def order_moves(self, legal_moves, hash_move):
+        """Returns legal_moves sorted best first: the principal variation
+        move while on it, then `hash_move`, killer moves and history score.
+        Root moves after the principal variation move follow their scores in
+        the previous iteration. Sets follow_pv for the first move."""
+        ply = self.ply
+        pv_move = self.pv[ply] if self.follow_pv and ply < len(self.pv) else None
+        self.follow_pv = pv_move in legal_moves
+        if ply == 0 and self.root_scores:
+            # Moves not scored last time (e.g. pruned) go last
+            sign = 1 if self.root_maximizing else -1
+            scores, missing = self.root_scores, float('-inf') * sign
+            return sorted(legal_moves, key=lambda move: (
+                move != pv_move, -sign * scores.get(move, missing)))
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+        side = ply & 1
+        return sorted(legal_moves, key=lambda move: (
+            move != pv_move, move != hash_move, move not in killers,
+            -history.get((side, move), 0)))
+
+    def record_cutoff(self, move, index, depth):
+        """Counts a cutoff by the move searched `index`-th and, when ordering,
+        makes it a killer move and credits its history."""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if not self.ordering:
+            return
+        ply = self.ply
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            self.killers[ply] = [move] + killers[:1]
+        key = (ply & 1, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def cutoff_rate(self):
+        """Returns the share of cutoffs caused by the first move searched,
+        the usual measure of move ordering quality; None before any cutoff."""
+        if not self.cutoffs:
+            return None
+        return self.first_move_cutoffs / self.cutoffs
+
+    def record_pv(self, move):
+        """Makes `move` followed by the line found below it the principal
+        variation of the current node."""
+        ply = self.ply
+        self.pv_table[ply] = (move,) + self.pv_table[ply + 1]
+
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
 
@@ -330,7 +538,7 @@ class CustomPlayer:
         tuple found in the game."""
         highest_score, selected_move = (float('-inf'), (-1, -1))
         for move in legal_moves:
-            score, _ = self.minimax(game.forecast_move(move), \
+            score, _ = self.search_move(self.minimax, game, move, \
             depth - 1, False)
             highest_score, selected_move = max((highest_score, \
             selected_move), (score, move))
@@ -341,7 +549,7 @@ class CustomPlayer:
         tuple found in the game."""
         lowest_score, selected_move = (float('inf'), (-1, -1))
         for move in legal_moves:
-            score, _ = self.minimax(game.forecast_move(move), depth - 1)
+            score, _ = self.search_move(self.minimax, game, move, depth - 1)
             lowest_score, selected_move = min((lowest_score, \
             selected_move), (score, move))
         return (lowest_score, selected_move)
@@ -382,47 +590,119 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
+        ordering = self.ordering
+        ply = self.ply
+        if ply == 0:
+            self.root_results = []
+            self.root_maximizing = maximizing_player
+            # Player 1 moves when the move count is even, so this player
+            # holds seat 2 when it is to move on an odd count or waits on
+            # an even one
+            player_2 = (game.active_player is self) == bool(game.move_count & 1)
+            self.seat_key = SEAT_KEY if player_2 else 0
+        if ordering:
+            if ply == 0:
+                self.follow_pv = True
+            while len(self.pv_table) <= ply + 1:
+                self.pv_table.append(())
+            self.pv_table[ply] = self.pv_table[ply + 1] = ()
+
         # Return heuristic value of game when search has reached max-depth
         if depth == 0:
             # Move need not be returned.
             # Min/Max players keep a track of them.
             return (self.score(game, self), None)
 
+        # Reuse a result from the table if it was searched deep enough and
+        # settles the score in the current window
+        table = self.table
+        entry = None
+        if table is not None:
+            key = game.hash() ^ self.seat_key
+            entry = table.lookup(key)
+            if entry is not None and entry.depth >= depth:
+                if entry.bound == TranspositionTable.EXACT:
+                    return (entry.score, entry.move)
+                # The root keeps its full window, so the scores of its moves
+                # stay comparable
+                if ply > 0:
+                    if entry.bound == TranspositionTable.LOWER:
+                        alpha = max(alpha, entry.score)
+                    else:
+                        beta = min(beta, entry.score)
+                    if alpha >= beta:
+                        return (entry.score, entry.move)
+
         # Verify if there are any available legal moves
         legal_moves = game.get_legal_moves()
         if not legal_moves:
             return (game.utility(self), (-1, -1))
+        if ordering:
+            legal_moves = self.order_moves(legal_moves, entry and entry.move)
 
         # Maximize/minimize play accordingly
         if maximizing_player:
-            return self.ab_maximize_play(game, legal_moves, depth, alpha, beta)
+            result = self.ab_maximize_play(game, legal_moves, depth, alpha, beta)
         else:
-            return self.ab_minimize_play(game, legal_moves, depth, alpha, beta)
+            result = self.ab_minimize_play(game, legal_moves, depth, alpha, beta)
+
+        if table is not None:
+            score, move = result
+            if score <= alpha:
+                bound = TranspositionTable.UPPER
+            elif score >= beta:
+                bound = TranspositionTable.LOWER
+            else:
+                bound = TranspositionTable.EXACT
+            table.store(key, depth, bound, score, move)
+        if ply == 0:
+            self.root_scores = dict(self.root_results)
+            if ordering:
+                self.pv = self.pv_table[0]
+        return result
 
     def ab_maximize_play(self, game, legal_moves, depth, alpha, beta):
         """Alphabeta maximizer player. Returns the highest score/move
-        tuple found in game, pruning the search tree."""
-        highest_score, selected_move = (float('-inf'), (-1, -1))
-        for move in legal_moves:
-            score, _ = self.alphabeta(game.forecast_move(move), \
+        tuple found in game, pruning the search tree. The score is fail-soft:
+        it may fall outside the alpha-beta window, and is then a bound."""
+        highest_score, selected_move = (float('-inf'), legal_moves[0])
+        on_pv = self.follow_pv
+        for index, move in enumerate(legal_moves):
+            self.follow_pv = on_pv and index == 0
+            score, _ = self.search_move(self.alphabeta, game, move, \
             depth - 1, alpha, beta, False)
+            if self.ply == 0:
+                self.root_results.append((move, score))
+            if score > highest_score or index == 0:
+                highest_score, selected_move = score, move
+                if self.ordering:
+                    self.record_pv(move)
             if score > alpha:
                 alpha = score
-                highest_score, selected_move = score, move
             if alpha >= beta:
+                self.record_cutoff(move, index, depth)
                 break
         return (highest_score, selected_move)
 
     def ab_minimize_play(self, game, legal_moves, depth, alpha, beta):
         """Alphabeta minimizer player. Returns the lowest score/move
-        tuple found in game, pruning the search tree."""
-        lowest_score, selected_move = (float('inf'), (-1, -1))
-        for move in legal_moves:
-            score, _ = self.alphabeta(game.forecast_move(move), \
+        tuple found in game, pruning the search tree. The score is fail-soft,
+        as for ab_maximize_play()."""
+        lowest_score, selected_move = (float('inf'), legal_moves[0])
+        on_pv = self.follow_pv
+        for index, move in enumerate(legal_moves):
+            self.follow_pv = on_pv and index == 0
+            score, _ = self.search_move(self.alphabeta, game, move, \
             depth - 1, alpha, beta, True)
+            if self.ply == 0:
+                self.root_results.append((move, score))
+            if score < lowest_score or index == 0:
+                lowest_score, selected_move = score, move
+                if self.ordering:
+                    self.record_pv(move)
             if score < beta:
                 beta = score
-                lowest_score, selected_move = score, move
             if beta <= alpha:
+                self.record_cutoff(move, index, depth)
                 break
         return (lowest_score, selected_move)
@@ -0,0 +1,300 @@
+"""
+This file contains the `BitBoard` class, a drop-in variant of
+`isolation.Board` that stores the game state in integers: one bitmask of the
+blank cells plus the cell index of each player. Cell (row, col) is bit
+row + col * height, the same index `Board` uses for its state list.
+
+The knight-move destinations of every cell are precomputed once per board
+size, so the legal moves of a player are a single AND of the destination mask
+with the blank mask, and counting them is a popcount.
+"""
+from .isolation import Board, zobrist_keys
+
+# Knight destinations per board size: (width, height) -> (masks, moves) where
+# masks[idx] has a bit set for every destination of cell idx and moves[idx]
+# lists them as (bit, (row, col)) pairs.
+_KNIGHT_TABLES = {}
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+
+def knight_tables(width, height):
+    """Return the (masks, moves) knight destination tables of a board size,
+    building them on first use.
+    """
+    key = (width, height)
+    if key not in _KNIGHT_TABLES:
+        masks, moves = [], []
+        for idx in range(width * height):
+            r, c = idx % height, idx // height
+            dests = [(1 << (r + dr + (c + dc) * height), (r + dr, c + dc))
+                     for dr, dc in DIRECTIONS
+                     if 0 <= r + dr < height and 0 <= c + dc < width]
+            masks.append(sum(bit for bit, _ in dests))
+            moves.append(dests)
+        _KNIGHT_TABLES[key] = masks, moves
+    return _KNIGHT_TABLES[key]
+
+
+def popcount(mask):
+    """Return the number of bits set in a non-negative integer."""
+    return bin(mask).count('1')
+
+
+class BitBoard(Board):
+    """Isolation board on integer bitmasks, compatible with `Board`.
+
+    Unlike `Board`, legal moves come in a fixed order rather than shuffled;
+    agents that want random tie-breaking should shuffle them.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        # Bit idx is set while cell idx is blank; player cells are indices,
+        # or NOT_MOVED before their first move
+        self._blank = (1 << (width * height)) - 1
+        self._loc_1 = Board.NOT_MOVED
+        self._loc_2 = Board.NOT_MOVED
+        self._masks, self._moves = knight_tables(width, height)
+        # (cell index, previous location of the mover, previous hash) of
+        # every applied move
+        self._move_stack = []
+        self._hash = 0
+        self._hash_base = 0
+        self._zobrist = zobrist_keys(width, height)
+
+    @classmethod
+    def from_board(cls, board):
+        """Return a BitBoard holding the same game state as a `Board`."""
+        new_board = cls(board._player_1, board._player_2, board.width, board.height)
+        new_board.move_count = board.move_count
+        new_board._active_player = board._active_player
+        new_board._inactive_player = board._inactive_player
+        state = board._board_state
+        new_board._blank = sum(1 << idx for idx in range(board.width * board.height)
+                               if state[idx] == Board.BLANK)
+        new_board._loc_1 = state[-1]
+        new_board._loc_2 = state[-2]
+        new_board._hash = board.hash()
+        new_board._hash_base = board.move_count
+        return new_board
+
+    def copy(self):
+        """ Return a copy of the current board. """
+        new_board = object.__new__(type(self))
+        new_board.__dict__ = self.__dict__.copy()
+        new_board._move_stack = []
+        new_board._hash_base = self._hash_base + len(self._move_stack)
+        return new_board
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                bool(self._blank >> (move[0] + move[1] * self.height) & 1))
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        blank, height = self._blank, self.height
+        return [(idx % height, idx // height) for idx in range(self.width * height)
+                if blank >> idx & 1]
+
+    def _location_index(self, player):
+        if player == self._player_1:
+            return self._loc_1
+        elif player == self._player_2:
+            return self._loc_2
+        raise RuntimeError(
+            "Invalid player in get_player_location: {}".format(player))
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return (idx % self.height, idx // self.height)
+
+    def legal_move_mask(self, player=None):
+        """Return the bitmask of the cells the player can move to; the
+        active player if None.
+        """
+        if player is None:
+            player = self._active_player
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self._blank
+        return self._masks[idx] & self._blank
+
+    def get_legal_moves(self, player=None):
+        """Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        -------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self._active_player
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        blank = self._blank
+        return [move for bit, move in self._moves[idx] if blank & bit]
+
+    def count_legal_moves(self, player=None):
+        """Return the number of legal moves of the player, without building
+        the list; the active player if None.
+        """
+        return popcount(self.legal_move_mask(player))
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        blocked, player_1, player_2, side = self._zobrist
+        if self._active_player == self._player_2:
+            previous, locations = self._loc_2, player_2
+            self._loc_2 = idx
+        else:
+            previous, locations = self._loc_1, player_1
+            self._loc_1 = idx
+        self._move_stack.append((idx, previous, self._hash))
+        if previous != Board.NOT_MOVED:
+            self._hash ^= locations[previous]
+        self._hash ^= blocked[idx] ^ locations[idx] ^ side
+        self._blank &= ~(1 << idx)
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+
+    def undo_move(self):
+        """Take back the last move applied to this board; see
+        `Board.undo_move`.
+        """
+        idx, previous, self._hash = self._move_stack.pop()
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        if self._active_player == self._player_2:
+            self._loc_2 = previous
+        else:
+            self._loc_1 = previous
+        self._blank |= 1 << idx
+        self.move_count -= 1
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self._inactive_player and not self.legal_move_mask()
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self._active_player and not self.legal_move_mask()
+
+    def utility(self, player):
+        """Returns the utility of the current game state from the perspective
+        of the specified player: +inf if the player has won, -inf if the
+        player has lost and 0 otherwise. See `Board.utility`.
+        """
+        if not self.legal_move_mask():
+
+            if player == self._inactive_player:
+                return float("inf")
+
+            if player == self._active_player:
+                return float("-inf")
+
+        return 0.
+
+    def get_moves(self, loc):
+        """Return the list of blank cells a knight can reach from `loc`, or
+        every blank cell if `loc` is None.
+        """
+        if loc == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        blank = self._blank
+        return [move for bit, move in self._moves[loc[0] + loc[1] * self.height]
+                if blank & bit]
+
+    def to_string(self, symbols=['1', '2']):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        col_margin = len(str(self.height - 1)) + 1
+        prefix = "{:<" + "{}".format(col_margin) + "}"
+        offset = " " * (col_margin + 3)
+        out = offset + '   '.join(map(str, range(self.width))) + '\n\r'
+        for i in range(self.height):
+            out += prefix.format(i) + ' | '
+            for j in range(self.width):
+                idx = i + j * self.height
+                if self._blank >> idx & 1:
+                    out += ' '
+                elif self._loc_1 == idx:
+                    out += symbols[0]
+                elif self._loc_2 == idx:
+                    out += symbols[1]
+                else:
+                    out += '-'
+                out += ' | '
+            out += '\n\r'
+
+        return out
@@ -13,6 +13,27 @@ from copy import copy
 
 TIME_LIMIT_MILLIS = 150
 
+# Zobrist keys per board size: (width, height) -> (blocked, player_1,
+# player_2, player_2_to_move). The hash of a state XORs the key of every
+# blocked cell, the keys of the cells the players stand on and the side to
+# move, so each move updates it with a few XORs.
+_ZOBRIST = {}
+
+
+def zobrist_keys(width, height):
+    """Return the Zobrist keys of a board size, drawing them from a seeded
+    generator on first use so hashes are the same in every process.
+    """
+    key = (width, height)
+    if key not in _ZOBRIST:
+        rng = random.Random((width << 16) | height)
+        cells = width * height
+        _ZOBRIST[key] = ([rng.getrandbits(64) for _ in range(cells)],
+                         [rng.getrandbits(64) for _ in range(cells)],
+                         [rng.getrandbits(64) for _ in range(cells)],
+                         rng.getrandbits(64))
+    return _ZOBRIST[key]
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -52,8 +73,42 @@ class Board(object):
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
 
+        # (cell index, previous location of the mover, previous hash) of
+        # every applied move, so undo_move() can take it back
+        self._move_stack = []
+        # Zobrist hash of the state, updated by apply_move(). It is only in
+        # step with the state while _hash_base (the move count when the
+        # undo stack was empty) plus the moves on the stack is move_count
+        self._hash = 0
+        self._hash_base = 0
+        self._zobrist = zobrist_keys(width, height)
+
     def hash(self):
-        return str(self._board_state).__hash__()
+        """Return the Zobrist hash of the game state: blocked cells, player
+        locations and the player to move.
+
+        The incremental hash is recomputed from the state when it is out of
+        step, e.g. on a copy made by a subclass that doesn't carry it over.
+        """
+        if self._hash_base + len(self._move_stack) != self.move_count:
+            return self._state_hash()
+        return self._hash
+
+    def _state_hash(self):
+        """Return the Zobrist hash of the game state computed from scratch."""
+        blocked, player_1, player_2, side = self._zobrist
+        height = self.height
+        value = side if self.move_count & 1 else 0
+        blank = set(self.get_blank_spaces())
+        for c in range(self.width):
+            for r in range(height):
+                if (r, c) not in blank:
+                    value ^= blocked[r + c * height]
+        for player, locations in ((self._player_1, player_1), (self._player_2, player_2)):
+            loc = self.get_player_location(player)
+            if loc != Board.NOT_MOVED:
+                value ^= locations[loc[0] + loc[1] * height]
+        return value
 
     @property
     def active_player(self):
@@ -91,12 +146,21 @@ class Board(object):
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
     def copy(self):
-        """ Return a deep copy of the current board. """
+        """Return a deep copy of the current board.
+
+        The copy carries the incremental hash over with `_hash` and
+        `_hash_base`, and starts with no moves to undo. Subclasses that
+        override copy() should carry both attributes over too; otherwise
+        hash() falls back to recomputing the hash from the state on every
+        call.
+        """
         new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
         new_board.move_count = self.move_count
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._hash = self._hash
+        new_board._hash_base = self._hash_base + len(self._move_stack)
         return new_board
 
     def forecast_move(self, move):
@@ -201,12 +265,38 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        previous = self._board_state[-last_move_idx]
+        self._move_stack.append((idx, previous, self._hash))
+        blocked, player_1, player_2, side = self._zobrist
+        locations = player_2 if last_move_idx == 2 else player_1
+        if previous != Board.NOT_MOVED:
+            self._hash ^= locations[previous]
+        self._hash ^= blocked[idx] ^ locations[idx] ^ side
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
+    def undo_move(self):
+        """Take back the last move applied to this board, restoring the
+        state it had before. Together with apply_move() this lets a search
+        walk the game tree on one board instead of copying it at every node
+        with forecast_move().
+
+        A copy starts with no moves to undo, so a board made by copy() or
+        forecast_move() can't take back the moves that led to it.
+
+        Raises IndexError if no move is left to undo.
+        """
+        idx, previous, self._hash = self._move_stack.pop()
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        last_move_idx = int(self.active_player == self._player_2) + 1
+        self._board_state[-last_move_idx] = previous
+        self._board_state[idx] = Board.BLANK
+        self._board_state[-3] ^= 1
+        self.move_count -= 1
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self._inactive_player and not self.get_legal_moves(self._active_player)
@@ -0,0 +1,261 @@
+"""
+Test cases for the board classes of the `isolation` package.
+"""
+import random
+import unittest
+
+import isolation
+import game_agent
+from sample_players import improved_score
+
+
+class BitBoardTest(unittest.TestCase):
+
+    def assertSameState(self, board, bitboard):
+        self.assertEqual(board.to_string(), bitboard.to_string())
+        self.assertEqual(board.get_blank_spaces(), bitboard.get_blank_spaces())
+        self.assertEqual(board.hash(), bitboard.hash())
+        for player in ('p1', 'p2'):
+            moves = board.get_legal_moves(player)
+            self.assertEqual(sorted(moves), sorted(bitboard.get_legal_moves(player)))
+            self.assertEqual(len(moves), bitboard.count_legal_moves(player))
+            self.assertEqual(board.get_player_location(player),
+                             bitboard.get_player_location(player))
+            self.assertEqual(board.utility(player), bitboard.utility(player))
+
+    def test_random_games_match_board(self):
+        rng = random.Random(0)
+        for width, height in ((7, 7), (5, 8), (4, 3)):
+            for _ in range(10):
+                board = isolation.Board('p1', 'p2', width, height)
+                bitboard = isolation.BitBoard('p1', 'p2', width, height)
+                while True:
+                    self.assertSameState(board, bitboard)
+                    moves = sorted(board.get_legal_moves())
+                    if not moves:
+                        break
+                    move = rng.choice(moves)
+                    board = board.forecast_move(move)
+                    bitboard = bitboard.forecast_move(move)
+
+    def test_from_board(self):
+        board = isolation.Board('p1', 'p2')
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        bitboard = isolation.BitBoard.from_board(board)
+        self.assertSameState(board, bitboard)
+        self.assertEqual(bitboard.active_player, 'p1')
+
+    def test_copy_is_independent(self):
+        bitboard = isolation.BitBoard('p1', 'p2')
+        bitboard.apply_move((3, 3))
+        child = bitboard.forecast_move((0, 0))
+        self.assertTrue(bitboard.move_is_legal((0, 0)))
+        self.assertFalse(child.move_is_legal((0, 0)))
+        self.assertNotEqual(bitboard.hash(), child.hash())
+
+
+class UndoMoveTest(unittest.TestCase):
+
+    def test_undo_restores_state(self):
+        for cls in (isolation.Board, isolation.BitBoard):
+            board = cls('p1', 'p2')
+            rng = random.Random(1)
+            states = []
+            while board.get_legal_moves():
+                states.append((board.to_string(), board.hash(), board.active_player,
+                               board.move_count))
+                board.apply_move(rng.choice(sorted(board.get_legal_moves())))
+            while states:
+                board.undo_move()
+                self.assertEqual((board.to_string(), board.hash(), board.active_player,
+                                  board.move_count), states.pop())
+            self.assertRaises(IndexError, board.undo_move)
+
+    def test_forecast_undoes_only_its_move(self):
+        for cls in (isolation.Board, isolation.BitBoard):
+            board = cls('p1', 'p2')
+            board.apply_move((3, 3))
+            child = board.forecast_move((0, 0))
+            child.undo_move()
+            self.assertEqual((child.to_string(), child.hash()),
+                             (board.to_string(), board.hash()))
+            self.assertRaises(IndexError, child.undo_move)
+
+    def test_inplace_search_matches_forecast(self):
+        for method in ('minimax', 'alphabeta'):
+            copying = game_agent.CustomPlayer(3, improved_score, False, method)
+            inplace = game_agent.CustomPlayer(3, improved_score, False, method, inplace=True)
+            for player in (copying, inplace):
+                player.time_left = lambda: float('inf')
+            games = [isolation.BitBoard(player, 'opp') for player in (copying, inplace)]
+            for move in ((2, 3), (0, 0), (4, 4), (1, 2)):
+                for game in games:
+                    game.apply_move(move)
+            before = games[1].to_string()
+            self.assertEqual(getattr(copying, method)(games[0], 3),
+                             getattr(inplace, method)(games[1], 3))
+            self.assertEqual(games[1].to_string(), before)
+
+
+class TranspositionTest(unittest.TestCase):
+
+    def test_zobrist_hash_of_transposed_games(self):
+        for cls in (isolation.Board, isolation.BitBoard):
+            first, second = cls('p1', 'p2'), cls('p1', 'p2')
+            for move in ((0, 0), (6, 6), (1, 2), (5, 5), (3, 3), (4, 4)):
+                first.apply_move(move)
+            for move in ((0, 0), (6, 6), (5, 5), (1, 2), (3, 3), (4, 4)):
+                second.apply_move(move)
+            self.assertEqual(first.hash(), second.hash())
+            self.assertNotEqual(first.hash(), first.forecast_move((2, 2)).hash())
+
+    def test_subclass_copy_without_hash(self):
+        class PlainCopyBoard(isolation.Board):
+            def copy(self):
+                new_board = PlainCopyBoard(self._player_1, self._player_2,
+                                           width=self.width, height=self.height)
+                new_board.move_count = self.move_count
+                new_board._active_player = self._active_player
+                new_board._inactive_player = self._inactive_player
+                new_board._board_state = list(self._board_state)
+                return new_board
+
+        board, plain = isolation.Board('p1', 'p2'), PlainCopyBoard('p1', 'p2')
+        for move in ((0, 0), (6, 6), (1, 2), (5, 5)):
+            board = board.forecast_move(move)
+            plain = plain.forecast_move(move)
+            self.assertEqual(plain.hash(), board.hash())
+            self.assertEqual(plain.copy().hash(), board.hash())
+        self.assertEqual(isolation.BitBoard.from_board(plain).hash(), board.hash())
+
+    def test_table_keeps_scores(self):
+        player = game_agent.CustomPlayer(4, improved_score, False, 'alphabeta')
+        player.time_left = lambda: float('inf')
+        game = isolation.BitBoard(player, 'opp')
+        for move in ((2, 3), (0, 0), (4, 4), (1, 2)):
+            game.apply_move(move)
+        score, _ = player.alphabeta(game, 4)
+        player.table = game_agent.TranspositionTable(1 << 10)
+        for _ in range(2):
+            table_score, move = player.alphabeta(game, 4)
+            self.assertEqual(table_score, score)
+            self.assertIn(move, game.get_legal_moves())
+        self.assertGreater(player.table.hits, 0)
+        self.assertRaises(ValueError, game_agent.TranspositionTable, 8, 'never')
+
+    def test_table_shared_between_seats(self):
+        def scores(table):
+            player = game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                             table=table)
+            player.time_left = lambda: float('inf')
+            results = []
+            for first, second, maximizing in ((player, 'opp', True), ('opp', player, False)):
+                game = isolation.BitBoard(first, second)
+                for move in ((2, 3), (0, 0), (4, 4), (1, 2)):
+                    game.apply_move(move)
+                for move in game.get_legal_moves():
+                    child = game.forecast_move(move)
+                    results.append(player.alphabeta(child, 4, maximizing_player=not maximizing)[0])
+            return results
+
+        shared = scores(game_agent.TranspositionTable())
+        fresh = scores(None)
+        self.assertEqual(shared, fresh)
+
+    def test_lost_position_returns_legal_move(self):
+        player = game_agent.CustomPlayer(3, improved_score, False, 'alphabeta')
+        player.time_left = lambda: float('inf')
+        game = isolation.BitBoard(player, 'opp', 5, 5)
+        for move in ((2, 0), (4, 0), (4, 1), (3, 2), (3, 3), (2, 4), (2, 1), (1, 2),
+                     (4, 2), (3, 1), (3, 0), (1, 0), (1, 1), (0, 2), (2, 3), (1, 4)):
+            game.apply_move(move)
+        score, move = player.alphabeta(game, 3)
+        self.assertEqual(score, float('-inf'))
+        self.assertIn(move, game.get_legal_moves())
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    def test_ordering_keeps_scores_and_prunes_more(self):
+        evaluations = []
+        players = []
+        for ordering in (False, True):
+            calls = []
+
+            def score_fn(game, player, calls=calls):
+                calls.append(game.hash())
+                return improved_score(game, player)
+
+            player = game_agent.CustomPlayer(score_fn=score_fn, method='alphabeta',
+                                             inplace=True, ordering=ordering)
+            player.time_left = lambda: float('inf')
+            game = isolation.BitBoard(player, 'opp')
+            for move in ((2, 3), (0, 0), (4, 4), (1, 2)):
+                game.apply_move(move)
+            results = [player.alphabeta(game, depth) for depth in range(1, 7)]
+            evaluations.append(len(calls))
+            players.append((player, results))
+        (plain, plain_results), (ordered, ordered_results) = players
+        self.assertEqual([score for score, _ in plain_results],
+                         [score for score, _ in ordered_results])
+        self.assertLess(evaluations[1], evaluations[0])
+        self.assertGreater(ordered.cutoff_rate(), plain.cutoff_rate())
+        self.assertEqual(ordered.pv[0], ordered_results[-1][1])
+
+
+class IterativeDeepeningTest(unittest.TestCase):
+
+    def start(self):
+        player = game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                         inplace=True, ordering=True,
+                                         table=game_agent.TranspositionTable())
+        game = isolation.BitBoard(player, 'opp')
+        for move in ((2, 3), (0, 0)):
+            game.apply_move(move)
+        return player, game
+
+    def test_timeout_before_first_iteration(self):
+        player, game = self.start()
+        legal_moves = game.get_legal_moves()
+        self.assertIn(player.get_move(game, legal_moves, lambda: 0), legal_moves)
+
+    def test_interrupted_iteration(self):
+        for searched in (0, 1, 3):
+            player, game = self.start()
+            legal_moves = game.get_legal_moves()
+            depths = []
+            alphabeta = player.alphabeta
+
+            def counting_alphabeta(game, depth, *args):
+                if player.ply == 0:
+                    depths.append(depth)
+                return alphabeta(game, depth, *args)
+
+            def time_left():
+                # Time out below the root once it has `searched` results at
+                # depth 4
+                interrupted = (len(depths) == 4 and player.ply > 0 and
+                               len(player.root_results) >= searched)
+                return 0 if interrupted else float('inf')
+
+            player.alphabeta = counting_alphabeta
+            move = player.get_move(game, legal_moves, time_left)
+            self.assertEqual(depths, [1, 2, 3, 4])
+            self.assertEqual(game.get_player_location(player), (2, 3))
+            results = player.root_results
+            self.assertEqual(len(results), searched)
+            previous = player.pv[0]
+            if not results:
+                self.assertEqual(move, previous)
+                continue
+            # The last best move is searched first, and only a move scoring
+            # at least as well at the deeper depth replaces it
+            scores = dict(results)
+            self.assertEqual(results[0][0], previous)
+            self.assertEqual(move, max(results, key=lambda result: result[1])[0])
+            self.assertGreaterEqual(scores[move], scores[previous])
+
+
+if __name__ == '__main__':
+    unittest.main()